@@ -0,0 +1,85 @@
+"""Implements a non-blocking asyncio front end for the PCF8574 I2C LCD."""
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+from i2c_lcd import I2cLcd
+
+
+class AsyncI2cLcd:
+    """Drives an I2cLcd from asyncio tasks without blocking the event loop.
+
+    All output goes to the LCD's framebuffer (see LcdApi.framebuffer_on), so
+    clear needs no slow commands or sleeps, and flush sends only the cells
+    that changed, yielding to other tasks after every line. Custom
+    characters are uploaded in a single batched transfer with no sleeps.
+
+    start() runs a background refresh task: coroutines just update the
+    screen, and every update made before the task gets to run is sent in
+    the same flush.
+
+    The constructor runs the normal (blocking) I2cLcd power-up sequence.
+    """
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns):
+        self.lcd = I2cLcd(i2c, i2c_addr, num_lines, num_columns, batch=True)
+        self.lcd.framebuffer_on()
+        self._lock = asyncio.Lock()
+        self._dirty = asyncio.Event()
+        self._task = None
+
+    def move_to(self, cursor_x, cursor_y):
+        """Moves the cursor; see LcdApi.move_to."""
+        self.lcd.move_to(cursor_x, cursor_y)
+
+    def write_at(self, cursor_x, cursor_y, text):
+        """Writes text at a position; see LcdApi.write_at."""
+        self.lcd.write_at(cursor_x, cursor_y, text)
+        self._dirty.set()
+
+    def write_line(self, cursor_y, text):
+        """Replaces a whole line; see LcdApi.write_line."""
+        self.lcd.write_line(cursor_y, text)
+        self._dirty.set()
+
+    async def putstr(self, string):
+        """Writes string at the cursor; see LcdApi.putstr."""
+        self.lcd.putstr(string)
+        self._dirty.set()
+
+    async def clear(self):
+        """Blanks the screen and homes the cursor; see LcdApi.clear."""
+        self.lcd.clear()
+        self._dirty.set()
+
+    async def custom_char(self, location, charmap):
+        """Writes a CGRAM character; see LcdApi.custom_char."""
+        async with self._lock:
+            self.lcd.custom_char(location, charmap)
+
+    async def flush(self):
+        """Sends everything written so far to the LCD."""
+        async with self._lock:
+            self._dirty.clear()
+            lcd = self.lcd
+            for y in range(lcd.num_lines):
+                lcd.flush_line(y)
+                await asyncio.sleep(0)
+
+    def start(self):
+        """Starts the background refresh task and returns it."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh())
+        return self._task
+
+    def stop(self):
+        """Stops the background refresh task. Updates that were not sent
+        yet stay in the framebuffer until the next flush.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh(self):
+        while True:
+            await self._dirty.wait()
+            await self.flush()
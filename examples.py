@@ -121,14 +121,20 @@ def example_6_scrolling_text():
     print("Пример 6: Прокрутка текста")
     lcd.clear()
     
+    from lcd_marquee import Marquee
+    
     long_text = "This is a very long text that will scroll across the LCD display!"
     
-    for i in range(len(long_text) - 19):
-        lcd.move_to(0, 0)
-        lcd.putstr("Scrolling Demo:")
-        lcd.move_to(0, 1)
-        lcd.putstr(long_text[i:i+20])
+    # Текст загружается в DDRAM один раз, дальше каждый шаг - одна команда
+    # сдвига дисплея. Сдвигается весь дисплей, поэтому заголовок тоже едет,
+    # а строка 3 показывает продолжение строки 1.
+    lcd.putstr("Scrolling Demo:")
+    ticker = Marquee(lcd, long_text, 1)
+    for i in range(len(long_text)):
+        ticker.step()
         time.sleep(0.2)
+    
+    lcd.clear()  # также убирает сдвиг дисплея
 
 # =============================================================================
 # ПРИМЕР 7: Счетчик с форматированием
@@ -152,8 +158,18 @@ def example_7_counter():
 # =============================================================================
 def example_8_clock():
     print("Пример 8: Часы")
-    lcd.clear()
-    lcd.putstr("Digital Clock:")
+    from lcd_widgets import Screen, Label, Clock
+    
+    # Экран из виджетов: каждый виджет перерисовывает только
+    # изменившиеся символы, так что каждую секунду меняются 1-2 цифры
+    screen = Screen(lcd, (
+        ("title", Label(0, 0, 20, "Digital Clock:")),
+        ("label", Label(0, 1, 6, "Time:")),
+        ("time", Clock(6, 1)),
+        ("date", Label(0, 2, 20, "Date: 09.06.2025")),
+        ("day", Label(0, 3, 20, "Monday")),
+    ))
+    screen.show()
     
     start_time = time.ticks_ms()
     
@@ -163,16 +179,8 @@ def example_8_clock():
         minutes = (elapsed // 60) % 60
         seconds = elapsed % 60
         
-        lcd.move_to(0, 1)
-        lcd.putstr(f"Time: {hours:02d}:{minutes:02d}:{seconds:02d}")
-        
-        # Показать дату (фиктивную)
-        lcd.move_to(0, 2)
-        lcd.putstr("Date: 09.06.2025")
-        
-        # Показать день недели
-        lcd.move_to(0, 3)
-        lcd.putstr("Monday")
+        screen["time"].set(hours, minutes, seconds)
+        screen.update()
         
         time.sleep(1)
 
@@ -181,8 +189,15 @@ def example_8_clock():
 # =============================================================================
 def example_9_temperature_monitor():
     print("Пример 9: Монитор температуры")
-    lcd.clear()
-    lcd.putstr("Temperature Monitor")
+    from lcd_widgets import Screen, Label, Number
+    
+    screen = Screen(lcd, (
+        ("title", Label(0, 0, 20, "Temperature Monitor")),
+        ("temp", Label(0, 1, 20)),
+        ("humidity", Number(0, 2, 20, "Humidity: %d%%", align="<")),
+        ("reading", Number(0, 3, 20, "Reading #%d", align="<")),
+    ))
+    screen.show()
     
     for i in range(20):
         # Симуляция температуры
@@ -190,12 +205,11 @@ def example_9_temperature_monitor():
         temp_f = temp_c * 9 // 5 + 32
         humidity = 45 + random.randint(-10, 20)
         
-        lcd.move_to(0, 1)
-        lcd.putstr(f"Temp: {temp_c}C / {temp_f}F")
-        lcd.move_to(0, 2)
-        lcd.putstr(f"Humidity: {humidity}%")
-        lcd.move_to(0, 3)
-        lcd.putstr(f"Reading #{i+1}")
+        # На LCD уходят только изменившиеся символы
+        screen["temp"].set(f"Temp: {temp_c}C / {temp_f}F")
+        screen["humidity"].set(humidity)
+        screen["reading"].set(i + 1)
+        screen.update()
         
         time.sleep(1)
 
@@ -204,29 +218,32 @@ def example_9_temperature_monitor():
 # =============================================================================
 def example_10_progress_bar():
     print("Пример 10: Индикатор прогресса")
-    lcd.clear()
-    lcd.putstr("Progress Bar Demo:")
+    from lcd_widgets import Screen, Label, Number, SmoothBar
+    
+    # Полоса на 100 шагов из 5 символов CGRAM (1-5 закрашенных столбцов):
+    # за шаг перерисовывается только одна ячейка на конце полосы
+    screen = Screen(lcd, (
+        ("title", Label(0, 0, 20, "Progress Bar Demo:")),
+        ("percent", Number(0, 1, 20, "Progress: %3d%%", align="<")),
+        ("bar", SmoothBar(0, 2, 20)),
+        ("status", Label(0, 3, 20)),
+    ))
+    screen.show()
     
     for progress in range(101):
-        lcd.move_to(0, 1)
-        lcd.putstr(f"Progress: {progress:3d}%")
-        
-        # Создать визуальную полосу прогресса
-        bar_length = (progress * 20) // 100
-        bar = "#" * bar_length + "-" * (20 - bar_length)
-        lcd.move_to(0, 2)
-        lcd.putstr(bar)
+        screen["percent"].set(progress)
+        screen["bar"].set(progress)
         
         # Статус
-        lcd.move_to(0, 3)
         if progress < 33:
-            lcd.putstr("Status: Starting... ")
+            screen["status"].set("Status: Starting...")
         elif progress < 66:
-            lcd.putstr("Status: Processing..")
+            screen["status"].set("Status: Processing..")
         elif progress < 100:
-            lcd.putstr("Status: Finishing.. ")
+            screen["status"].set("Status: Finishing..")
         else:
-            lcd.putstr("Status: Complete!   ")
+            screen["status"].set("Status: Complete!")
+        screen.update()
         
         time.sleep(0.1)
 
@@ -244,9 +261,11 @@ def example_11_menu():
         "6. Exit"
     ]
     
-    selected = 0
-    
-    for demo_step in range(len(menu_items) * 2):  # Демо навигации
+    # Каждый экран меню готовится заранее на своей странице; при
+    # переключении отправляются только изменившиеся символы, без очистки
+    pages = []
+    for selected in range(len(menu_items)):
+        lcd.draw_page(lcd.new_page())
         lcd.clear()
         lcd.putstr("Main Menu:")
         
@@ -256,9 +275,13 @@ def example_11_menu():
             lcd.move_to(0, i + 1)
             prefix = ">" if i == 0 else " "
             lcd.putstr(f"{prefix} {menu_items[menu_index]}")
-        
-        selected = (selected + 1) % len(menu_items)
+        pages.append(lcd.draw_page())
+    
+    for demo_step in range(len(menu_items) * 2):  # Демо навигации
+        lcd.show_page(pages[demo_step % len(menu_items)])
         time.sleep(1)
+    
+    lcd.framebuffer_off()
 
 # =============================================================================
 # ПРИМЕР 12: Системная информация
@@ -279,16 +302,20 @@ def example_12_system_info():
         ("LCD Info:", "Model: 2004", "Size: 20x4", "I2C Address: 0x27")
     ]
     
+    # Экраны рисуются на страницах и показываются без очистки дисплея
+    pages = []
     for title, line1, line2, line3 in info_screens:
-        lcd.clear()
-        lcd.putstr(title)
-        lcd.move_to(0, 1)
-        lcd.putstr(line1)
-        lcd.move_to(0, 2)
-        lcd.putstr(line2)
-        lcd.move_to(0, 3)
-        lcd.putstr(line3)
+        page = lcd.new_page()
+        lcd.draw_page(page)
+        for y, line in enumerate((title, line1, line2, line3)):
+            lcd.write_line(y, line)
+        pages.append(page)
+    
+    for page in pages:
+        lcd.show_page(page)
         time.sleep(3)
+    
+    lcd.framebuffer_off()
 
 # =============================================================================
 # ПРИМЕР 13: Создание пользовательских символов
@@ -454,6 +481,15 @@ def example_16_multilingual():
         lcd.move_to(0, 3)
         lcd.putstr(line3)
         time.sleep(3)
+    
+    # Русский текст на модуле со стандартным ПЗУ (A00): буквы без
+    # латинских двойников загружаются в CGRAM, не больше 8 на экран,
+    # остальные заменяются транслитерацией
+    from lcd_cyrillic import CyrillicPlanner
+    planner = CyrillicPlanner(lcd)
+    lcd.clear()
+    planner.show(("Русский:", "Привет, мир!", "Добро пожаловать!", "Хорошего дня!"))
+    time.sleep(3)
 
 # =============================================================================
 # ПРИМЕР 17: Тестирование всех позиций экрана
@@ -513,32 +549,28 @@ def example_17_position_test():
 # =============================================================================
 def example_18_performance_test():
     print("Пример 18: Тест производительности")
+    import json
+    import lcd_bench
     
     lcd.clear()
     lcd.putstr("Performance Test:")
+    lcd.move_to(0, 1)
+    lcd.putstr("See console output")
     
-    start_time = time.ticks_ms()
-    
-    # Быстрая запись большого количества символов
-    for i in range(100):
-        lcd.move_to(0, 1)
-        lcd.putstr(f"Iteration: {i:3d}")
-        lcd.move_to(0, 2)
-        lcd.putstr("X" * (i % 21))
-        lcd.move_to(0, 3)
-        lcd.putstr("=" * ((i * 2) % 21))
-    
-    end_time = time.ticks_ms()
-    duration = time.ticks_diff(end_time, start_time)
+    # Набор тестов из lcd_bench на реальной шине; результаты в JSON
+    results = lcd_bench.run(i2c, 0x27, 4, 20)
+    print(json.dumps(results))
     
+    # Полная перерисовка экрана: транзакции I2C и время шины при 400 кГц
+    redraw = results["results"]["batched"]["full_redraw"]
     lcd.clear()
     lcd.putstr("Performance Result:")
     lcd.move_to(0, 1)
-    lcd.putstr(f"100 iterations")
+    lcd.putstr("Full redraw (20x4)")
     lcd.move_to(0, 2)
-    lcd.putstr(f"Time: {duration}ms")
+    lcd.putstr(f"I2C writes: {redraw['transactions']:.0f}")
     lcd.move_to(0, 3)
-    lcd.putstr(f"Avg: {duration/100:.1f}ms/op")
+    lcd.putstr(f"Bus: {redraw['bus_us_400k'] / 1000:.1f}ms @400k")
     
     time.sleep(3)
 
@@ -562,6 +594,21 @@ def example_19_line_wrapping():
         time.sleep(0.05)  # Медленный вывод для демонстрации
     
     time.sleep(3)
+    
+    # Тот же текст в буфере, перенесенный по словам, и окно, которое его
+    # прокручивает: каждый шаг перезаписывает только изменившиеся символы
+    from lcd_canvas import TextBuffer, Viewport
+    text = TextBuffer(lcd.encode)
+    text.append(long_text, width=20)
+    view = Viewport(0, 0, 20, 4, text)
+    lcd.clear()
+    view.render(lcd)
+    for step in range(len(text) - 4):
+        time.sleep(1)
+        view.scroll(1)
+        view.render(lcd)
+    
+    time.sleep(3)
 
 # =============================================================================
 # ПРИМЕР 20: Финальная демонстрация всех возможностей
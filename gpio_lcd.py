@@ -0,0 +1,141 @@
+"""Implements a HD44780 character LCD connected directly to GPIO pins."""
+from lcd_api import LcdApi
+from lcd_time import sleep_ms, ticks_us, ticks_diff
+
+# How long the LCD takes to carry out an instruction, in usec: clear and
+# home, and everything else (37 usec, plus 4 usec for DDRAM/CGRAM writes
+# and a margin for slower clones).
+SLOW_EXEC_US = 5000
+EXEC_US = 50
+
+
+class GpioLcd(LcdApi):
+    """Drives a HD44780 LCD wired straight to GPIO pins, in 8 bit mode if
+    d0_pin - d7_pin are all given and in 4 bit mode with only d4_pin -
+    d7_pin (D0 - D3 of the LCD are then left unconnected).
+
+    The pins are machine.Pin objects that are already set up as outputs.
+    RW is driven low if rw_pin is given; otherwise it should be tied to
+    ground. backlight_pin, if given, switches the backlight.
+
+    Rather than sleeping after each transfer, the driver notes when the
+    LCD will be ready again and only waits, if it has to, before the next
+    one, so work done between writes overlaps the LCD's execution time.
+    Only the data pins that change between transfers are written.
+    """
+    def __init__(self, rs_pin, enable_pin, d0_pin=None, d1_pin=None,
+                 d2_pin=None, d3_pin=None, d4_pin=None, d5_pin=None,
+                 d6_pin=None, d7_pin=None, rw_pin=None, backlight_pin=None,
+                 num_lines=2, num_columns=16):
+        self.rs_pin = rs_pin
+        self.enable_pin = enable_pin
+        self.rw_pin = rw_pin
+        self.backlight_pin = backlight_pin
+        self._4bit = d0_pin is None
+        if self._4bit:
+            self.data_pins = [d4_pin, d5_pin, d6_pin, d7_pin]
+        else:
+            self.data_pins = [d0_pin, d1_pin, d2_pin, d3_pin,
+                              d4_pin, d5_pin, d6_pin, d7_pin]
+        # What the data pins and RS were last set to (None: unknown), and
+        # the ticks_us value from which the LCD takes the next transfer.
+        self._data = None
+        self._rs = None
+        self._ready_at = ticks_us()
+        self.enable_pin.value(0)
+        if self.rw_pin is not None:
+            self.rw_pin.value(0)
+        if self.backlight_pin is not None:
+            self.backlight_pin.value(0)
+
+        sleep_ms(20)   # Allow LCD time to powerup
+        # Send reset 3 times, then put the LCD into 4 bit mode if need be.
+        # The first reset needs a delay of at least 4.1 msec.
+        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        sleep_ms(5)
+        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        sleep_ms(1)
+        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        sleep_ms(1)
+        if self._4bit:
+            self.hal_write_init_nibble(self.LCD_FUNCTION)
+            sleep_ms(1)
+        # The function set has to come before any other instruction.
+        cmd = self.LCD_FUNCTION
+        if not self._4bit:
+            cmd |= self.LCD_FUNCTION_8BIT
+        if num_lines > 1:
+            cmd |= self.LCD_FUNCTION_2LINES
+        self.hal_write_command(cmd)
+        LcdApi.__init__(self, num_lines, num_columns)
+
+    def hal_write_init_nibble(self, nibble):
+        """Writes the upper half of nibble with RS low, as one 8 bit mode
+        transfer.
+        """
+        self._set_rs(0)
+        if self._4bit:
+            self._pulse(nibble >> 4)
+        else:
+            self._pulse(nibble)
+        self._ready_at = ticks_us()
+
+    def hal_backlight_on(self):
+        if self.backlight_pin is not None:
+            self.backlight_pin.value(1)
+
+    def hal_backlight_off(self):
+        if self.backlight_pin is not None:
+            self.backlight_pin.value(0)
+
+    def hal_write_command(self, cmd):
+        self._set_rs(0)
+        self._write_byte(cmd)
+        if cmd <= 3:
+            # Clear and home take much longer than other commands.
+            self._ready_at = ticks_us() + SLOW_EXEC_US
+
+    def hal_write_data(self, data):
+        self._set_rs(1)
+        self._write_byte(data)
+
+    def hal_write_data_bulk(self, data, start=0, end=None):
+        if end is None:
+            end = len(data)
+        self._set_rs(1)
+        write_byte = self._write_byte
+        for i in range(start, end):
+            write_byte(data[i])
+
+    def hal_sleep_us(self, usecs):
+        # Every transfer already waits until the LCD is ready for it.
+        pass
+
+    def _set_rs(self, rs):
+        if rs != self._rs:
+            self._rs = rs
+            self.rs_pin.value(rs)
+
+    def _write_byte(self, byte):
+        """Writes byte with RS as it is set, once the LCD is ready."""
+        while ticks_diff(self._ready_at, ticks_us()) > 0:
+            pass
+        if self._4bit:
+            self._pulse(byte >> 4)
+            self._pulse(byte & 0x0f)
+        else:
+            self._pulse(byte)
+        self._ready_at = ticks_us() + EXEC_US
+
+    def _pulse(self, value):
+        """Puts value on the data pins and latches it with a pulse on E."""
+        changed = value ^ self._data if self._data is not None else 0xff
+        self._data = value
+        pins = self.data_pins
+        for i in range(len(pins)):
+            if changed & (1 << i):
+                pins[i].value((value >> i) & 1)
+        # Each pin write takes longer than the 450 nsec E pulse width and
+        # the setup and hold times around it.
+        self.enable_pin.value(1)
+        self.enable_pin.value(0)
@@ -1,7 +1,6 @@
 """Implements a HD44780 character LCD connected via PCF8574 on I2C with Cyrillic support."""
 from lcd_api import LcdApi 
-from machine import I2C 
-from time import sleep_ms 
+from lcd_time import sleep_ms, ticks_us, ticks_diff
 
 # The PCF8574 has a jumper selectable address: 0x20 - 0x27 
 MASK_RS = 0x01 
@@ -10,6 +9,11 @@ MASK_E = 0x04
 SHIFT_BACKLIGHT = 3 
 SHIFT_DATA = 4 
 
+# Number of LCD bytes (4 PCF8574 frames each) collected before a batch is
+# sent. Batched frames go out back to back, so the bus itself provides the
+# 37 usec execution delay; this holds for bus clocks up to 400 kHz.
+BATCH_BYTES = 96
+
 # Cyrillic characters mapping (CP1251 to custom CGRAM locations)
 CYRILLIC_MAP = {
     'А': 0x41, 'Б': 0xA0, 'В': 0x42, 'Г': 0xA1,
@@ -30,91 +34,370 @@ CYRILLIC_MAP = {
     'ь': 0xC4, 'э': 0xC5, 'ю': 0xC6, 'я': 0xC7
 }
 
+# CYRILLIC_MAP compiled into lookup tables at import: one entry for every
+# Latin-1 code point, plus one for every code point of the U+0400 - U+045F
+# Cyrillic block. Anything else keeps the low byte of its code point.
+# Changes made to CYRILLIC_MAP after import are not picked up.
+CYRILLIC_FIRST = 0x400
+
+def _build_tables():
+    latin1 = bytearray(range(256))
+    cyrillic = bytearray([code & 0xff for code in range(CYRILLIC_FIRST, CYRILLIC_FIRST + 0x60)])
+    for char, code in CYRILLIC_MAP.items():
+        if ord(char) < 0x100:
+            latin1[ord(char)] = code
+        else:
+            cyrillic[ord(char) - CYRILLIC_FIRST] = code
+    return bytes(latin1), bytes(cyrillic)
+
+LATIN1_TABLE, CYRILLIC_TABLE = _build_tables()
+# Plain ASCII text can skip the table lookups if they leave it unchanged.
+_ASCII_IDENTITY = LATIN1_TABLE[:0x80] == bytes(range(0x80))
+
+def power_up(i2c, i2c_addrs, warm=False, num_lines=2):
+    """Runs the power up and reset sequence that puts LCDs into 4 bit mode
+    on every PCF8574 address in i2c_addrs, sharing the delays between them.
+    It ends with the function set for num_lines lines, which the HD44780
+    needs straight after the switch to 4 bit mode and before any other
+    instruction.
+
+    With warm set the LCDs are taken to be powered and in 4 bit mode
+    already (e.g. after a soft reset of the board), so there is no power up
+    delay and the reset nibbles only bring 4 bit transfers back in step,
+    in case the board was reset halfway through a byte. That takes about
+    2 msec instead of 28.
+    """
+    if warm:
+        # The first nibble may complete a byte sent before the reset, and
+        # the worst such byte (return home) takes 1.52 msec.
+        _write_nibbles(i2c, i2c_addrs, (LcdApi.LCD_FUNCTION_RESET,))
+        sleep_ms(2)
+        # Now "3 3" is a function set to 8 bit mode whatever came before,
+        # then "3" and "2" complete the usual switch to 4 bit mode.
+        _write_nibbles(i2c, i2c_addrs, (LcdApi.LCD_FUNCTION_RESET,
+                                        LcdApi.LCD_FUNCTION_RESET,
+                                        LcdApi.LCD_FUNCTION))
+        _write_function_set(i2c, i2c_addrs, num_lines)
+        return
+    for addr in i2c_addrs:
+        i2c.writeto(addr, bytearray([0]))
+    sleep_ms(20)   # Allow LCD time to powerup 
+
+    # Send reset 3 times, then put LCD into 4 bit mode. The first reset
+    # needs a delay of at least 4.1 msec.
+    for nibble, delay in ((LcdApi.LCD_FUNCTION_RESET, 5),
+                          (LcdApi.LCD_FUNCTION_RESET, 1),
+                          (LcdApi.LCD_FUNCTION_RESET, 1),
+                          (LcdApi.LCD_FUNCTION, 1)):
+        _write_nibbles(i2c, i2c_addrs, (nibble,))
+        sleep_ms(delay)
+    _write_function_set(i2c, i2c_addrs, num_lines)
+
+def clear_all(i2c, i2c_addrs):
+    """Clears the LCDs on every PCF8574 address in i2c_addrs and waits for
+    them once, rather than once per LCD. Meant for LCDs that power_up has
+    just set up, before they get an I2cLcd with warm set (which does not
+    clear the screen).
+    """
+    _write_command(i2c, i2c_addrs, LcdApi.LCD_CLR)
+    sleep_ms(5)
+
+def _write_function_set(i2c, i2c_addrs, num_lines):
+    """Sends the 4 bit mode function set for num_lines lines (and the 5x8
+    font) to every LCD. The I2C transfers that follow take longer than the
+    37 usec it needs.
+    """
+    cmd = LcdApi.LCD_FUNCTION
+    if num_lines > 1:
+        cmd |= LcdApi.LCD_FUNCTION_2LINES
+    _write_command(i2c, i2c_addrs, cmd)
+
+def _write_command(i2c, i2c_addrs, cmd):
+    """Sends cmd to every LCD in 4 bit mode, as two nibbles."""
+    _write_nibbles(i2c, i2c_addrs, (cmd & 0xf0, (cmd << 4) & 0xf0))
+
+def _write_nibbles(i2c, i2c_addrs, nibbles):
+    """Sends the upper halves of nibbles to every LCD as init nibbles, in
+    one write per LCD.
+    """
+    buf = bytearray(2 * len(nibbles))
+    for i, nibble in enumerate(nibbles):
+        byte = ((nibble >> 4) & 0x0f) << SHIFT_DATA
+        buf[2 * i] = byte | MASK_E
+        buf[2 * i + 1] = byte
+    for addr in i2c_addrs:
+        i2c.writeto(addr, buf)
+
 class I2cLcd(LcdApi): 
-    def __init__(self, i2c, i2c_addr, num_lines, num_columns): 
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns, batch=True,
+                 reset=True, warm=False, busy_flag=False): 
         self.i2c = i2c 
         self.i2c_addr = i2c_addr 
-        self.i2c.writeto(self.i2c_addr, bytearray([0])) 
-        sleep_ms(20)   # Allow LCD time to powerup 
-        
-        # Send reset 3 times 
-        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET) 
-        sleep_ms(5)    # need to delay at least 4.1 msec 
-        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET) 
-        sleep_ms(1) 
-        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET) 
-        sleep_ms(1) 
+        # With busy_flag set, slow commands (clear and home) poll the LCD's
+        # busy flag rather than sleeping for a fixed 5 msec. This needs RW
+        # wired to P1 of the PCF8574, as on the common backpacks. Whether
+        # the flag can be read is checked once the LCD is set up (see
+        # _probe_busy_flag); until then the driver sleeps.
+        self.busy_flag = False
+        self._rd_frames = bytearray(2)
+        self._status = bytearray(1)
+        # With batch set, frames are packed into one buffer and sent with a
+        # single writeto per run; otherwise every frame is its own write.
+        self.batch = batch
+        self._buf = bytearray(4 * BATCH_BYTES)
+        self._mv = memoryview(self._buf)
+        # memoryviews of the first 4, 8, 12... bytes of _buf, made the first
+        # time each length is sent, so that sending does not allocate.
+        self._views = [None] * (BATCH_BYTES + 1)
+        # One-frame buffer for writes that are not batched.
+        self._frame = bytearray(1)
+        self._buf_len = 0
+        self._hold = 0
+        self._enc = bytearray(num_columns)
+        # reset can be turned off if power_up has already been run for
+        # this LCD, e.g. together with other LCDs on the same bus. warm
+        # skips the power up delay and clearing the screen, for an LCD that
+        # stayed powered while the board was reset (see power_up).
+        if reset:
+            power_up(self.i2c, (self.i2c_addr,), warm, num_lines)
         
-        # Put LCD into 4 bit mode 
-        self.hal_write_init_nibble(self.LCD_FUNCTION) 
-        sleep_ms(1) 
-        
-        LcdApi.__init__(self, num_lines, num_columns) 
-        cmd = self.LCD_FUNCTION 
-        if num_lines > 1: 
-            cmd |= self.LCD_FUNCTION_2LINES 
-        self.hal_write_command(cmd) 
+        self.hal_begin_batch()
+        try:
+            LcdApi.__init__(self, num_lines, num_columns, warm) 
+        finally:
+            self.hal_end_batch()
+        if busy_flag:
+            self.busy_flag = self._probe_busy_flag()
         
         # Load Cyrillic characters to CGRAM
         self._init_cyrillic_chars()
     
     def _init_cyrillic_chars(self):
         """Initialize custom Cyrillic characters in CGRAM."""
-        # This is a simplified example - you'll need to provide actual 5x8 patterns
-        # for each Cyrillic character you want to support
+        # Nothing to load up front: CYRILLIC_MAP needs a controller with a
+        # Cyrillic character ROM. On the standard A00 ROM use
+        # lcd_cyrillic.CyrillicPlanner, which loads the letters that have no
+        # Latin lookalike into CGRAM as each screen needs them.
         pass
     
     def _map_cyrillic(self, char):
         """Map Cyrillic character to custom code."""
-        return CYRILLIC_MAP.get(char, ord(char))
-    
-    def putchar(self, char):
-        """Writes the indicated character to the LCD with Cyrillic support."""
-        if char == '\n':
-            if self.implied_newline:
-                pass 
-            else: 
-                self.cursor_x = self.num_columns 
-        else: 
-            # Handle Cyrillic characters
-            code = self._map_cyrillic(char)
-            self.hal_write_data(code) 
-            self.cursor_x += 1 
-            
-        if self.cursor_x >= self.num_columns: 
-            self.cursor_x = 0 
-            self.cursor_y += 1 
-            self.implied_newline = (char != '\n') 
-        if self.cursor_y >= self.num_lines: 
-            self.cursor_y = 0 
-        self.move_to(self.cursor_x, self.cursor_y)
+        code = ord(char)
+        if code < 0x100:
+            return LATIN1_TABLE[code]
+        if 0 <= code - CYRILLIC_FIRST < len(CYRILLIC_TABLE):
+            return CYRILLIC_TABLE[code - CYRILLIC_FIRST]
+        return code & 0xff
     
+    # LcdApi.putchar looks every character up through _map_char
+    _map_char = _map_cyrillic
+
+    def encode(self, text):
+        """Returns text as the character codes the LCD uses, as bytes,
+        with Cyrillic letters translated through CYRILLIC_MAP.
+        Static strings can be encoded once and the result passed to
+        write_at or write_line.
+        """
+        data = text.encode()
+        if len(data) == len(text) and _ASCII_IDENTITY:
+            return data
+        buf = self._enc
+        if len(buf) < len(text):
+            buf = self._enc = bytearray(len(text))
+        latin1 = LATIN1_TABLE
+        cyrillic = CYRILLIC_TABLE
+        num_cyrillic = len(cyrillic)
+        i = 0
+        for char in text:
+            code = ord(char)
+            if code < 0x100:
+                code = latin1[code]
+            elif 0 <= code - CYRILLIC_FIRST < num_cyrillic:
+                code = cyrillic[code - CYRILLIC_FIRST]
+            else:
+                code &= 0xff
+            buf[i] = code
+            i += 1
+        return bytes(buf[:i])
+
     # The rest of the methods remain the same as in your original file
     def hal_write_init_nibble(self, nibble): 
         byte = ((nibble >> 4) & 0x0f) << SHIFT_DATA 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E])) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte])) 
+        self._write_frame(byte | MASK_E) 
+        self._write_frame(byte) 
         
     def hal_backlight_on(self): 
-        self.i2c.writeto(self.i2c_addr, bytearray([1 << SHIFT_BACKLIGHT])) 
+        self._write_frame(1 << SHIFT_BACKLIGHT) 
         
     def hal_backlight_off(self): 
-        self.i2c.writeto(self.i2c_addr, bytearray([0])) 
+        self._write_frame(0) 
         
     def hal_write_command(self, cmd): 
-        byte = ((self.backlight << SHIFT_BACKLIGHT) | (((cmd >> 4) & 0x0f) << SHIFT_DATA)) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E])) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte])) 
-        byte = ((self.backlight << SHIFT_BACKLIGHT) | ((cmd & 0x0f) << SHIFT_DATA)) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E])) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte])) 
+        if not self.batch:
+            self._write_frames(0, cmd)
+        else:
+            self._queue(0, cmd)
+            if cmd <= 3 or not self._hold:
+                self._send()
         if cmd <= 3: 
-            sleep_ms(5) 
+            self._wait_ready(5)
             
     def hal_write_data(self, data): 
-        byte = (MASK_RS | (self.backlight << SHIFT_BACKLIGHT) | (((data >> 4) & 0x0f) << SHIFT_DATA)) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E])) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte])) 
-        byte = (MASK_RS | (self.backlight << SHIFT_BACKLIGHT) | ((data & 0x0f) << SHIFT_DATA)) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E])) 
-        self.i2c.writeto(self.i2c_addr, bytearray([byte]))
+        if not self.batch:
+            self._write_frames(MASK_RS, data)
+        else:
+            self._queue(MASK_RS, data)
+            if not self._hold:
+                self._send()
+
+    def hal_write_data_bulk(self, data, start=0, end=None):
+        if end is None:
+            end = len(data)
+        if not self.batch:
+            for i in range(start, end):
+                self._write_frames(MASK_RS, data[i])
+            return
+        # Same packing as _queue, inlined so a long run costs one call.
+        flags = MASK_RS | (self.backlight << SHIFT_BACKLIGHT)
+        buf = self._buf
+        size = len(buf)
+        n = self._buf_len
+        for i in range(start, end):
+            byte = data[i]
+            if n == size:
+                self._buf_len = n
+                self._send()
+                n = 0
+            hi = flags | ((byte >> 4) << SHIFT_DATA)
+            lo = flags | ((byte & 0x0f) << SHIFT_DATA)
+            buf[n] = hi | MASK_E
+            buf[n + 1] = hi
+            buf[n + 2] = lo | MASK_E
+            buf[n + 3] = lo
+            n += 4
+        self._buf_len = n
+        if not self._hold:
+            self._send()
+
+    def hal_begin_batch(self):
+        self._hold += 1
+
+    def hal_end_batch(self):
+        self._hold -= 1
+        if not self._hold:
+            self._send()
+
+    def hal_sleep_us(self, usecs):
+        # While frames are being queued nothing has reached the LCD yet, and
+        # the queued frames take longer on the bus than the delays requested.
+        if self._hold and self.batch:
+            return
+        LcdApi.hal_sleep_us(self, usecs)
+
+    def _wait_ready(self, msecs):
+        """Waits until the LCD has carried out the last command (clear or
+        home): by polling the busy flag if busy_flag is set, otherwise for
+        msecs.
+
+        busy_flag is only set once _probe_busy_flag has read the flag. If
+        it is still set after msecs, or reading it fails or gives 0xff
+        later on, busy_flag is turned off and the address is set back to 0,
+        where clear and home leave it, in case the reads were taken as a
+        command (see _probe_busy_flag).
+        """
+        if self.busy_flag:
+            start = ticks_us()
+            try:
+                while ticks_diff(ticks_us(), start) < 1000 * msecs:
+                    status = self.read_status()
+                    if not status & 0x80:
+                        return
+                    if status == 0xff:
+                        break
+            except OSError:
+                pass
+            self.busy_flag = False
+            msecs -= ticks_diff(ticks_us(), start) // 1000
+            if msecs > 0:
+                sleep_ms(msecs)
+            self.hal_write_command(self.LCD_DDRAM)
+            return
+        sleep_ms(msecs)
+
+    def _probe_busy_flag(self):
+        """Returns True if the busy flag can be read. The LCD is idle at
+        this point, so a readable flag is clear; reading fails or gives
+        0xff (the data lines left floating high) when it cannot be read,
+        e.g. because RW is tied to ground. The LCD then took the E pulses
+        of the read as a command 0xff (set DDRAM address 0x7f), so the
+        cursor is moved back to where it was.
+        """
+        try:
+            if not self.read_status() & 0x80:
+                return True
+        except OSError:
+            pass
+        self._lcd_addr = None
+        self.move_to(self.cursor_x, self.cursor_y)
+        return False
+
+    def read_status(self):
+        """Reads the busy flag (bit 7) and the address counter (bits 0-6)
+        of the LCD, with RW high and the data lines of the PCF8574 set to
+        inputs (written high).
+        """
+        frames = self._rd_frames
+        status = self._status
+        base = MASK_RW | 0xf0 | (self.backlight << SHIFT_BACKLIGHT)
+        # RW goes high a frame before E, and low again a frame after it.
+        frames[0] = base
+        frames[1] = base | MASK_E
+        self.i2c.writeto(self.i2c_addr, frames)
+        self.i2c.readfrom_into(self.i2c_addr, status)
+        value = status[0] & 0xf0
+        self.i2c.writeto(self.i2c_addr, frames)
+        self.i2c.readfrom_into(self.i2c_addr, status)
+        value |= status[0] >> 4
+        frames[1] = self.backlight << SHIFT_BACKLIGHT
+        self.i2c.writeto(self.i2c_addr, frames)
+        return value
+
+    def _write_frames(self, rs, value):
+        """Send one byte as four separate single-frame writes."""
+        byte = (rs | (self.backlight << SHIFT_BACKLIGHT) | (((value >> 4) & 0x0f) << SHIFT_DATA)) 
+        self._write_frame(byte | MASK_E) 
+        self._write_frame(byte) 
+        byte = (rs | (self.backlight << SHIFT_BACKLIGHT) | ((value & 0x0f) << SHIFT_DATA)) 
+        self._write_frame(byte | MASK_E) 
+        self._write_frame(byte)
+
+    def _write_frame(self, byte):
+        """Send a single frame, reusing one buffer."""
+        self._frame[0] = byte
+        self.i2c.writeto(self.i2c_addr, self._frame)
+
+    def _queue(self, rs, value):
+        """Append the four frames for one byte to the batch buffer."""
+        n = self._buf_len
+        if n == len(self._buf):
+            self._send()
+            n = 0
+        buf = self._buf
+        flags = rs | (self.backlight << SHIFT_BACKLIGHT)
+        byte = flags | (((value >> 4) & 0x0f) << SHIFT_DATA)
+        buf[n] = byte | MASK_E
+        buf[n + 1] = byte
+        byte = flags | ((value & 0x0f) << SHIFT_DATA)
+        buf[n + 2] = byte | MASK_E
+        buf[n + 3] = byte
+        self._buf_len = n + 4
+
+    def _send(self):
+        """Send all queued frames in a single I2C transaction."""
+        n = self._buf_len
+        if n:
+            view = self._views[n >> 2]
+            if view is None:
+                view = self._views[n >> 2] = self._mv[:n]
+            self.i2c.writeto(self.i2c_addr, view)
+            self._buf_len = 0
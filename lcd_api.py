@@ -1,5 +1,37 @@
 """Provides an API for talking to HD44780 compatible character LCDs.""" 
-import time 
+from lcd_time import sleep_us
+# Unchanged cells a run of changed cells may take in to avoid splitting.
+# Rewriting one unchanged cell costs the same as the address command that
+# starting a new run takes, so only gaps of two or more cells split a run.
+RUN_GAP = 1
+def next_change(new, old, start, end, base=0):
+    """Returns the first column x in start through end - 1 where
+    new[base + x] differs from old[base + x], or -1 if there is none.
+    """
+    x = start
+    while x < end:
+        if new[base + x] != old[base + x]:
+            return x
+        x += 1
+    return -1
+def run_end(new, old, start, end, base=0):
+    """Returns the last column of the run of changed cells that starts at
+    column start (which must differ), taking in gaps of up to RUN_GAP
+    unchanged cells; columns are compared as in next_change. Together they
+    split a line into the runs worth writing:
+        x = next_change(new, old, 0, end)
+        while x >= 0:
+            last = run_end(new, old, x, end)
+            ...write columns x through last...
+            x = next_change(new, old, last + 1, end)
+    """
+    last = start
+    x = start + 1
+    while x < end and x - last <= RUN_GAP + 1:
+        if new[base + x] != old[base + x]:
+            last = x
+        x += 1
+    return last
 class LcdApi: 
     """Implements the API for talking with HD44780 compatible character LCDs. 
     This class only knows what commands to send to the LCD, and not how to get 
@@ -34,7 +66,12 @@ class LcdApi:
     LCD_RS_DATA = 1 
     LCD_RW_WRITE = 0 
     LCD_RW_READ = 1 
-    def __init__(self, num_lines, num_columns): 
+    # The lcd_trace.BusTracer instrumenting this LCD, if any.
+    tracer = None
+    def __init__(self, num_lines, num_columns, warm=False): 
+        # warm means the LCD has already been set up, e.g. before a soft
+        # reset of the board: only the settings this class relies on are
+        # sent, and the screen is not cleared.
         self.num_lines = num_lines 
         if self.num_lines > 4: 
             self.num_lines = 4 
@@ -45,6 +82,28 @@ class LcdApi:
         self.cursor_y = 0 
         self.implied_newline = False 
         self.backlight = True 
+        # How many positions the display has been shifted to the left (see
+        # scroll_display_left), modulo the length of a DDRAM line.
+        self.display_shift = 0
+        # Shadow framebuffer used by framebuffer_on/flush (None when output
+        # goes straight to the LCD), the frame last sent to the LCD and a
+        # bit mask of the lines whose cells on the LCD are unknown.
+        self.framebuffer = None
+        self._shown = None
+        self._stale_lines = 0
+        # The page flush sends to the LCD: normally the framebuffer itself,
+        # but another one while draw_page is preparing a page off-screen.
+        self._front = None
+        # Where the LCD's address counter points, or None if unknown. The
+        # LCD advances it after every data write (LCD_ENTRY_INC), so it is
+        # only set explicitly when the cursor jumps.
+        self._lcd_addr = None
+        if warm:
+            self.backlight_on()
+            self.hal_write_command(self.LCD_ENTRY_MODE | self.LCD_ENTRY_INC)
+            self.hide_cursor()  # also turns the display on
+            self.move_to(0, 0)
+            return
         self.display_off() 
         self.backlight_on() 
         self.clear() 
@@ -55,8 +114,15 @@ class LcdApi:
         """Clears the LCD display and moves the cursor to the top left 
         corner. 
         """ 
-        self.hal_write_command(self.LCD_CLR) 
-        self.hal_write_command(self.LCD_HOME) 
+        if self.framebuffer is not None:
+            # The next flush blanks only the cells that are not blank yet.
+            for i in range(len(self.framebuffer)):
+                self.framebuffer[i] = 0x20
+        else:
+            # LCD_CLR also returns the cursor home, so no LCD_HOME needed.
+            self.hal_write_command(self.LCD_CLR) 
+            self._lcd_addr = 0
+            self.display_shift = 0
         self.cursor_x = 0 
         self.cursor_y = 0 
     def show_cursor(self): 
@@ -80,6 +146,33 @@ class LcdApi:
     def display_off(self): 
         """Turns off (i.e. blanks) the LCD.""" 
         self.hal_write_command(self.LCD_ON_CTRL) 
+    def scroll_display_left(self):
+        """Shifts the display one position to the left, without changing
+        what is in DDRAM: every line then shows the next position of its
+        DDRAM line, which wraps around after 40 characters (80 on a one
+        line display). Positions written with move_to etc. move along.
+        """
+        self.hal_write_command(self.LCD_MOVE | self.LCD_MOVE_DISP)
+        self.display_shift = (self.display_shift + 1) % self.ddram_line_length()
+    def scroll_display_right(self):
+        """Shifts the display one position to the right; see
+        scroll_display_left.
+        """
+        self.hal_write_command(self.LCD_MOVE | self.LCD_MOVE_DISP |
+                               self.LCD_MOVE_RIGHT)
+        self.display_shift = (self.display_shift - 1) % self.ddram_line_length()
+    def return_home(self):
+        """Undoes any display shift and moves the cursor to the top left
+        corner, without clearing the display.
+        """
+        self.hal_write_command(self.LCD_HOME)
+        self._lcd_addr = 0
+        self.display_shift = 0
+        self.cursor_x = 0
+        self.cursor_y = 0
+    def ddram_line_length(self):
+        """Returns the number of characters in each DDRAM line."""
+        return 40 if self.num_lines > 1 else 80
     def backlight_on(self): 
         """Turns the backlight on. 
         This isn't really an LCD command, but some modules have backlight 
@@ -97,15 +190,24 @@ class LcdApi:
     def move_to(self, cursor_x, cursor_y): 
         """Moves the cursor position to the indicated position. The cursor 
         position is zero based (i.e. cursor_x == 0 indicates first column). 
+        No command is sent if the LCD is already at that position.
         """ 
         self.cursor_x = cursor_x 
         self.cursor_y = cursor_y 
+        if self.framebuffer is not None:
+            return
+        addr = self._ddram_addr(cursor_x, cursor_y)
+        if addr != self._lcd_addr:
+            self.hal_write_command(self.LCD_DDRAM | addr) 
+            self._lcd_addr = addr
+    def _ddram_addr(self, cursor_x, cursor_y):
+        """Returns the DDRAM address of the indicated cursor position."""
         addr = cursor_x & 0x3f 
         if cursor_y & 1: 
             addr += 0x40    # Lines 1 & 3 add 0x40 
         if cursor_y & 2:    # Lines 2 & 3 add number of columns 
             addr += self.num_columns 
-        self.hal_write_command(self.LCD_DDRAM | addr) 
+        return addr
     def putchar(self, char): 
         """Writes the indicated character to the LCD at the current cursor 
         position, and advances the cursor by one position. 
@@ -118,32 +220,265 @@ class LcdApi:
             else: 
                 self.cursor_x = self.num_columns 
         else: 
-            self.hal_write_data(ord(char)) 
+            code = self._map_char(char)
+            if self.framebuffer is not None:
+                self.framebuffer[self.cursor_y * self.num_columns + self.cursor_x] = code
+            else:
+                self.hal_write_data(code) 
+                if self._lcd_addr is not None:
+                    self._lcd_addr += 1
             self.cursor_x += 1 
         if self.cursor_x >= self.num_columns: 
             self.cursor_x = 0 
             self.cursor_y += 1 
             self.implied_newline = (char != '\n') 
-        if self.cursor_y >= self.num_lines: 
-            self.cursor_y = 0 
-        self.move_to(self.cursor_x, self.cursor_y) 
+            if self.cursor_y >= self.num_lines: 
+                self.cursor_y = 0 
+            # Within a line the LCD follows the cursor by itself; only a
+            # wrap to the next line needs an address command.
+            self.move_to(self.cursor_x, self.cursor_y) 
     def putstr(self, string): 
         """Write the indicated string to the LCD at the current cursor 
         position and advances the cursor position appropriately. 
         """ 
-        for char in string: 
-            self.putchar(char) 
+        self.hal_begin_batch()
+        try:
+            for char in string: 
+                self.putchar(char) 
+        finally:
+            self.hal_end_batch()
+    def write_at(self, cursor_x, cursor_y, text):
+        """Writes text starting at the indicated position. Unlike putstr
+        the text never wraps: whatever does not fit on the line is dropped.
+        text may also be bytes that are already encoded for the LCD. The
+        cursor is left where putstr would have left it. Nothing is written
+        if the position is off the screen.
+        """
+        if not (0 <= cursor_x < self.num_columns and
+                0 <= cursor_y < self.num_lines):
+            return
+        room = self.num_columns - cursor_x
+        if isinstance(text, str):
+            text = self.encode(text[:room])
+        elif len(text) > room:
+            text = text[:room]
+        self._write_encoded(cursor_x, cursor_y, text)
+    def write_line(self, cursor_y, text):
+        """Replaces the contents of a whole line with text, padded with
+        spaces or clipped to the width of the LCD. Nothing is written if
+        there is no line cursor_y.
+        """
+        if not 0 <= cursor_y < self.num_lines:
+            return
+        cols = self.num_columns
+        if isinstance(text, str):
+            text = self.encode(text[:cols])
+        elif len(text) > cols:
+            text = text[:cols]
+        if len(text) < cols:
+            # A new buffer: the caller's bytearray must not grow.
+            text = bytes(text) + b' ' * (cols - len(text))
+        self._write_encoded(0, cursor_y, text)
+    def _write_encoded(self, cursor_x, cursor_y, data):
+        """Writes already encoded and clipped data at the indicated
+        position as a single run.
+        """
+        if self.framebuffer is not None:
+            start = cursor_y * self.num_columns + cursor_x
+            self.framebuffer[start:start + len(data)] = data
+        else:
+            self.hal_begin_batch()
+            try:
+                self.move_to(cursor_x, cursor_y)
+                self.hal_write_data_bulk(data)
+                if self._lcd_addr is not None:
+                    self._lcd_addr += len(data)
+            finally:
+                self.hal_end_batch()
+        self.cursor_x = cursor_x + len(data)
+        self.cursor_y = cursor_y
+        if self.cursor_x >= self.num_columns:
+            self.cursor_x = 0
+            self.cursor_y += 1
+            self.implied_newline = True
+            if self.cursor_y >= self.num_lines:
+                self.cursor_y = 0
+            self.move_to(self.cursor_x, self.cursor_y)
+    def write_ddram(self, addr, data, start=0, end=None):
+        """Writes the character codes data[start:end] straight to DDRAM
+        from the raw address addr on (0x00 - 0x27 for the first line and
+        0x40 - 0x67 for the second one on a two line display), bypassing
+        the framebuffer, e.g. to fill positions that are scrolled out of
+        view. The data must not run past the end of the line. The cursor
+        is left where it was.
+        """
+        if end is None:
+            end = len(data)
+        self.hal_begin_batch()
+        try:
+            if addr != self._lcd_addr:
+                self.hal_write_command(self.LCD_DDRAM | addr)
+            self.hal_write_data_bulk(data, start, end)
+            self._lcd_addr = addr + end - start
+            self.move_to(self.cursor_x, self.cursor_y)
+        finally:
+            self.hal_end_batch()
+    def _map_char(self, char):
+        """Returns the character code the LCD uses for char, keeping the
+        low byte of code points above 0xff as encode does.
+        """
+        return ord(char) & 0xff
+    def encode(self, text):
+        """Returns text as the character codes the LCD uses, as bytes.
+        Static strings can be encoded once and the result passed to
+        write_at or write_line.
+        """
+        return bytes([ord(char) & 0xff for char in text])
+    def framebuffer_on(self):
+        """Starts buffered mode. putchar, putstr, move_to and clear then
+        only update an in-memory copy of the screen, which is sent to the
+        LCD by flush. The first flush redraws every cell.
+        """
+        size = self.num_lines * self.num_columns
+        self.framebuffer = bytearray(b' ' * size)
+        self._front = self.framebuffer
+        self._shown = bytearray(b' ' * size)
+        self._stale_lines = (1 << self.num_lines) - 1
+    def framebuffer_off(self):
+        """Flushes the framebuffer and goes back to writing straight to
+        the LCD.
+        """
+        self.flush()
+        self.framebuffer = None
+        self._front = None
+        self._shown = None
+        self.move_to(self.cursor_x, self.cursor_y)
+    def new_page(self):
+        """Returns a new blank page: a buffer holding a whole screen, to be
+        drawn on off-screen with draw_page and put on the LCD with
+        show_page. Turns framebuffer mode on if it is off; the framebuffer
+        it starts with is a page too.
+        """
+        if self.framebuffer is None:
+            self.framebuffer_on()
+        return bytearray(b' ' * (self.num_lines * self.num_columns))
+    def draw_page(self, page=None):
+        """Makes putchar, putstr, write_at, clear etc. draw on page while
+        the LCD keeps showing the page it shows, which flush keeps sending;
+        with page None, drawing goes back to the page shown. Returns the
+        page drawn on before. The cursor position is shared by all pages.
+        """
+        previous = self.framebuffer
+        self.framebuffer = self._front if page is None else page
+        return previous
+    def show_page(self, page):
+        """Swaps page onto the LCD in one flush and makes it the page drawn
+        on. Only the cells in which page differs from what the LCD shows
+        are sent, so the screen is not cleared and never shows half of
+        one page and half of another, e.g. when switching menu screens.
+        """
+        self.framebuffer = page
+        self._front = page
+        self.flush()
+    def flush(self):
+        """Sends the framebuffer cells that changed since the last flush to
+        the LCD. Each run of changed cells costs one DDRAM address command,
+        and runs the LCD address counter already points at cost none.
+        """
+        if self.framebuffer is None:
+            return
+        self.hal_begin_batch()
+        try:
+            for y in range(self.num_lines):
+                self.flush_line(y)
+        finally:
+            self.hal_end_batch()
+    def flush_line(self, cursor_y):
+        """Does what flush does, for a single line."""
+        frame = self.framebuffer
+        if frame is None:
+            return
+        self.hal_begin_batch()
+        try:
+            self._flush_line(cursor_y)
+        finally:
+            self.hal_end_batch()
+    def _flush_line(self, cursor_y):
+        frame = self._front
+        shown = self._shown
+        full = self._stale_lines & (1 << cursor_y)
+        self._stale_lines &= ~(1 << cursor_y)
+        cols = self.num_columns
+        if full:
+            self._flush_run(cursor_y, 0, cols - 1)
+            return
+        base = cursor_y * cols
+        x = next_change(frame, shown, 0, cols, base)
+        while x >= 0:
+            last = run_end(frame, shown, x, cols, base)
+            self._flush_run(cursor_y, x, last)
+            x = next_change(frame, shown, last + 1, cols, base)
+    def dirty_lines(self):
+        """Returns a bit mask of the lines that flush would send anything
+        for (0 when not in framebuffer mode).
+        """
+        if self.framebuffer is None:
+            return 0
+        mask = self._stale_lines
+        cols = self.num_columns
+        frame = self._front
+        shown = self._shown
+        for y in range(self.num_lines):
+            # Compared in place: slicing would copy both lines.
+            if next_change(frame, shown, 0, cols, y * cols) >= 0:
+                mask |= 1 << y
+        return mask
+    def _flush_run(self, cursor_y, start, last):
+        """Writes columns start through last of one framebuffer row to the
+        LCD.
+        """
+        addr = self._ddram_addr(start, cursor_y)
+        if addr != self._lcd_addr:
+            self.hal_write_command(self.LCD_DDRAM | addr)
+        start += cursor_y * self.num_columns
+        end = cursor_y * self.num_columns + last + 1
+        frame = self._front
+        shown = self._shown
+        # Index by hand rather than slicing: flushing must not allocate.
+        self.hal_write_data_bulk(frame, start, end)
+        for i in range(start, end):
+            shown[i] = frame[i]
+        self._lcd_addr = addr + end - start
+    def cgram_in_use(self):
+        """Returns a bit mask of the CGRAM characters (chr(0) through
+        chr(7)) that are shown on the LCD or waiting in the framebuffer.
+        Returns None when not in framebuffer mode, as what the LCD shows
+        is then unknown.
+        """
+        if self.framebuffer is None:
+            return None
+        mask = 0
+        for frame in (self.framebuffer, self._front, self._shown):
+            for code in frame:
+                if code < 0x10:     # 0x08 - 0x0f mirror 0x00 - 0x07
+                    mask |= 1 << (code & 0x7)
+        return mask
     def custom_char(self, location, charmap): 
         """Write a character to one of the 8 CGRAM locations, available 
         as chr(0) through chr(7). 
         """ 
         location &= 0x7 
-        self.hal_write_command(self.LCD_CGRAM | (location << 3)) 
-        self.hal_sleep_us(40) 
-        for i in range(8): 
-            self.hal_write_data(charmap[i]) 
+        self.hal_begin_batch()
+        try:
+            self.hal_write_command(self.LCD_CGRAM | (location << 3)) 
+            self._lcd_addr = None
             self.hal_sleep_us(40) 
-        self.move_to(self.cursor_x, self.cursor_y)
+            for i in range(8): 
+                self.hal_write_data(charmap[i]) 
+                self.hal_sleep_us(40) 
+            self.move_to(self.cursor_x, self.cursor_y)
+        finally:
+            self.hal_end_batch()
         
     def hal_backlight_on(self): 
         """Allows the hal layer to turn the backlight on. 
@@ -167,8 +502,30 @@ class LcdApi:
         function. 
         """ 
         raise NotImplementedError 
+    def hal_write_data_bulk(self, data, start=0, end=None):
+        """Write the data bytes data[start:end] to the LCD.
+        If desired, a derived HAL class will implement this function to
+        send the whole run at once; by default each byte is passed to
+        hal_write_data.
+        """
+        if end is None:
+            end = len(data)
+        for i in range(start, end):
+            self.hal_write_data(data[i])
+    def hal_begin_batch(self):
+        """Marks the start of a run of commands and data that the hal
+        layer may collect and send to the LCD in one go.
+        If desired, a derived HAL class will implement this function.
+        """
+        pass
+    def hal_end_batch(self):
+        """Marks the end of a run started by hal_begin_batch. Anything
+        the hal layer collected must reach the LCD before this returns.
+        If desired, a derived HAL class will implement this function.
+        """
+        pass
     def hal_sleep_us(self, usecs): 
         """Sleep for some time (given in microseconds).""" 
-        time.sleep_us(usecs)
+        sleep_us(usecs)
 
 
@@ -0,0 +1,246 @@
+"""Throughput benchmarks for the I2C LCD driver.
+
+Runs a fixed set of operations against I2cLcd and reports, per operation,
+the I2C transactions and bytes it took, the time those would keep the bus
+busy at common clock rates, the CPU time spent in Python and the heap
+memory allocated. On MicroPython that is the gc.mem_alloc() growth with the
+garbage collector off, which counts every allocation and is 0 for
+frame_refresh, the steady-state hot path. On CPython it is the peak traced
+by tracemalloc above that of a run that only flushes, so objects freed
+again straight away count too; CPython allocates range iterators and ints
+that MicroPython does not, so there it is only good for comparing
+operations (tests/test_alloc.py checks the hot path itself). Without a
+real bus the operations go to a counting fake, so the numbers are
+reproducible on a PC:
+
+    python lcd_bench.py [iterations] > results.json
+"""
+import gc
+import json
+import sys
+from i2c_lcd import I2cLcd
+from lcd_time import ticks_us, ticks_diff
+try:
+    # Not MicroPython. Process time leaves out the driver's sleeps.
+    from time import process_time
+
+    def cpu_us():
+        return int(process_time() * 1000000)
+except ImportError:
+    def cpu_us():
+        return ticks_us()
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+BUS_FREQS = (100000, 400000, 1000000)
+
+# Driver configurations to compare: (name, I2cLcd batch, framebuffer_on).
+CONFIGS = (
+    ('unbatched', False, False),
+    ('batched', True, False),
+    ('framebuffer', True, True),
+)
+
+
+class CountingI2C:
+    """Counts the transactions and bytes sent to an I2C bus. Writes are
+    passed on to i2c if one is given and dropped otherwise.
+    """
+    def __init__(self, i2c=None):
+        self.i2c = i2c
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def writeto(self, addr, buf, stop=True):
+        self.transactions += 1
+        self.bytes += len(buf)
+        if self.i2c is not None:
+            return self.i2c.writeto(addr, buf, stop)
+        return len(buf)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        self.transactions += 1
+        self.bytes += nbytes
+        if self.i2c is not None:
+            return self.i2c.readfrom(addr, nbytes, stop)
+        return bytes(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.transactions += 1
+        self.bytes += len(buf)
+        if self.i2c is not None:
+            return self.i2c.readfrom_into(addr, buf, stop)
+
+
+def bus_us(transactions, nbytes, freq):
+    """Returns how long transactions carrying nbytes in total keep a bus
+    running at freq busy, in usec: 9 clocks per byte including the
+    address byte, plus a clock each for START and STOP.
+    """
+    return (9 * (nbytes + transactions) + 2 * transactions) * 1000000 // freq
+
+
+def heap_used():
+    """Returns the number of bytes allocated on the heap now (see
+    _heap_growth for the peak on CPython).
+    """
+    if tracemalloc is None:
+        return gc.mem_alloc()
+    return tracemalloc.get_traced_memory()[0]
+
+
+# Full-width lines of pre-encoded text for _frame_refresh, by width.
+_FRAME_LINES = {}
+
+
+def _frame_refresh(lcd, i):
+    lines = _FRAME_LINES.get(lcd.num_columns)
+    if lines is None:
+        lines = _FRAME_LINES[lcd.num_columns] = (
+            b'A' * lcd.num_columns, b'B' * lcd.num_columns)
+    line = lines[i & 1]
+    for y in range(lcd.num_lines):
+        lcd.write_line(y, line)
+
+
+def _full_redraw(lcd, i):
+    char = 'AB'[i & 1]
+    for y in range(lcd.num_lines):
+        lcd.move_to(0, y)
+        lcd.putstr(char * lcd.num_columns)
+
+
+def _single_cell(lcd, i):
+    lcd.move_to(lcd.num_columns - 1, lcd.num_lines - 1)
+    lcd.putchar(str(i % 10))
+
+
+def _scroll_line(lcd, i):
+    text = 'This is a very long text that will scroll across the LCD display!'
+    i %= len(text) - lcd.num_columns + 1
+    lcd.move_to(0, 1)
+    lcd.putstr(text[i:i + lcd.num_columns])
+
+
+def _custom_char(lcd, i):
+    lcd.custom_char(0, [i & 0x1f] * 8)
+
+
+def _clear(lcd, i):
+    lcd.clear()
+
+
+OPERATIONS = (
+    ('frame_refresh', _frame_refresh),
+    ('full_redraw', _full_redraw),
+    ('single_cell', _single_cell),
+    ('scroll_line', _scroll_line),
+    ('custom_char', _custom_char),
+    ('clear', _clear),
+)
+
+
+def measure(lcd, counter, operation, iterations):
+    """Runs operation iterations times (each followed by a flush) and
+    returns the per-operation averages.
+    """
+    # One untimed run so every operation starts from a settled screen.
+    operation(lcd, iterations)
+    lcd.flush()
+    counter.reset()
+    start = cpu_us()
+    for i in range(iterations):
+        operation(lcd, i)
+        lcd.flush()
+    cpu = ticks_diff(cpu_us(), start)
+    result = {
+        'transactions': counter.transactions / iterations,
+        'bytes': counter.bytes / iterations,
+        'cpu_us': cpu / iterations,
+    }
+    for freq in BUS_FREQS:
+        result['bus_us_%dk' % (freq // 1000)] = bus_us(
+            counter.transactions, counter.bytes, freq) / iterations
+    result['heap_bytes'] = measure_heap(lcd, operation, iterations) / iterations
+    return result
+
+
+def measure_heap(lcd, operation, iterations):
+    """Returns the heap memory allocated by running operation iterations
+    times (each followed by a flush), including objects that were freed
+    again.
+    """
+    if tracemalloc is not None:
+        tracemalloc.start()
+    gc.collect()
+    gc.disable()
+    try:
+        # A first round lets caches fill up, and makes objects that are
+        # merely replaced on every run (counters and the like) ones that
+        # were allocated while traced.
+        _heap_growth(lcd, operation, iterations)
+        # Measuring allocates a little itself, and on CPython so does
+        # every loop (range objects, ints); flushing after an operation
+        # that does nothing tells how much.
+        overhead = _heap_growth(lcd, _nothing, iterations)
+        return max(_heap_growth(lcd, operation, iterations) - overhead, 0)
+    finally:
+        gc.enable()
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+
+def _nothing(lcd, i):
+    pass
+
+
+def _heap_growth(lcd, operation, iterations):
+    if tracemalloc is not None:
+        tracemalloc.reset_peak()
+    before = heap_used()
+    # No for loop here: its iterator would still be on the heap when the
+    # heap is measured.
+    i = 0
+    while i < iterations:
+        operation(lcd, i)
+        lcd.flush()
+        i += 1
+    if tracemalloc is not None:
+        # Objects freed again before the end only show in the peak.
+        return tracemalloc.get_traced_memory()[1] - before
+    return heap_used() - before
+
+
+def run(i2c=None, i2c_addr=0x27, num_lines=4, num_columns=20, iterations=20):
+    """Runs every operation in every driver configuration and returns the
+    results as a dict.
+    """
+    results = {}
+    for name, batch, framebuffer in CONFIGS:
+        counter = CountingI2C(i2c)
+        lcd = I2cLcd(counter, i2c_addr, num_lines, num_columns, batch=batch)
+        if framebuffer:
+            lcd.framebuffer_on()
+        results[name] = {}
+        for op_name, operation in OPERATIONS:
+            results[name][op_name] = measure(lcd, counter, operation, iterations)
+    return {
+        'display': '%dx%d' % (num_columns, num_lines),
+        'iterations': iterations,
+        'results': results,
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(json.dumps(run(iterations=iterations)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Shows numbers in big digits, 2 or 4 rows high, drawn with CGRAM glyphs."""
+
+# Building blocks of the big digits, as 5x8 bitmaps.
+SEGMENT_GLYPHS = (
+    (0b00111, 0b01111, 0b11111, 0b11111, 0b11111, 0b11111, 0b11111, 0b11111),
+    (0b11111, 0b11111, 0b11111, 0b00000, 0b00000, 0b00000, 0b00000, 0b00000),
+    (0b11100, 0b11110, 0b11111, 0b11111, 0b11111, 0b11111, 0b11111, 0b11111),
+    (0b11111, 0b11111, 0b11111, 0b11111, 0b11111, 0b11111, 0b01111, 0b00111),
+    (0b00000, 0b00000, 0b00000, 0b00000, 0b00000, 0b11111, 0b11111, 0b11111),
+    (0b11111, 0b11111, 0b11111, 0b11111, 0b11111, 0b11111, 0b11110, 0b11100),
+    (0b11111, 0b11111, 0b11111, 0b00000, 0b00000, 0b00000, 0b11111, 0b11111),
+    (0b11111, 0b00000, 0b00000, 0b00000, 0b00000, 0b11111, 0b11111, 0b11111),
+)
+# Names under which the glyphs are kept in a GlyphCache.
+SEGMENT_NAMES = ('big_lt', 'big_ub', 'big_rt', 'big_ll',
+                 'big_lb', 'big_lr', 'big_umb', 'big_lmb')
+
+# Cells that are not glyphs: a character from the LCD's ROM that fills the
+# whole cell (0xff in the usual ROMs; change BLOCK_CODE if yours has
+# something else there), and a blank.
+BLOCK = 8
+BLANK = 9
+BLOCK_CODE = 0xff
+
+UB = 1
+LB = 4
+
+# 3x2 cells per character, top row first, as indexes into SEGMENT_GLYPHS.
+FONT_2 = {
+    '0': (0, 1, 2, 3, 4, 5),
+    '1': (1, 2, BLANK, 4, BLOCK, 4),
+    '2': (6, 6, 2, 3, 7, 7),
+    '3': (6, 6, 2, 7, 7, 5),
+    '4': (3, 4, BLOCK, BLANK, BLANK, BLOCK),
+    '5': (BLOCK, 6, 6, 7, 7, 5),
+    '6': (0, 6, 6, 3, 7, 5),
+    '7': (1, 1, 2, BLANK, BLANK, BLOCK),
+    '8': (0, 6, 2, 3, 7, 5),
+    '9': (0, 6, 2, BLANK, BLANK, BLOCK),
+    '-': (LB, LB, LB, BLANK, BLANK, BLANK),
+    ' ': (BLANK,) * 6,
+}
+
+# Seven segment patterns (bits a - g from bit 0 up) for the 4 row font.
+SEVEN_SEGMENTS = {
+    '0': 0x3f, '1': 0x06, '2': 0x5b, '3': 0x4f, '4': 0x66,
+    '5': 0x6d, '6': 0x7d, '7': 0x07, '8': 0x7f, '9': 0x6f,
+    '-': 0x40, ' ': 0x00,
+}
+
+
+def _seven_segment_cells(segments):
+    """Returns the 3x4 cells of a seven segment pattern, drawn with full
+    blocks for the upright segments and bars for the others.
+    """
+    a, b, c, d, e, f, g = [(segments >> bit) & 1 for bit in range(7)]
+
+    def corner(upright, bar, bar_glyph):
+        return BLOCK if upright else (bar_glyph if bar else BLANK)
+
+    return (
+        corner(f, a, UB), UB if a else BLANK, corner(b, a, UB),
+        corner(f, g, LB), LB if g else BLANK, corner(b, g, LB),
+        BLOCK if e else BLANK, BLANK, BLOCK if c else BLANK,
+        corner(e, d, LB), LB if d else BLANK, corner(c, d, LB),
+    )
+
+
+FONT_4 = {}
+for _char in SEVEN_SEGMENTS:
+    FONT_4[_char] = _seven_segment_cells(SEVEN_SEGMENTS[_char])
+
+
+class BigNumber:
+    """Shows a number in big digits, 3 columns wide with one blank column
+    between them, from (x, y) over 2 or 4 rows. Digits, '-' and ' ' are
+    supported.
+
+    The 2 row font uses all 8 CGRAM slots and the 4 row font two of them
+    (first_slot and first_slot + 1); they are uploaded once, with the first
+    render. To share CGRAM with other users, pass a lcd_glyphs.GlyphCache
+    as glyphs instead, which hands out the glyphs as they are needed.
+
+    set() only records the value; render() rewrites the digits that changed
+    and nothing else. BigNumber can also be put in a lcd_widgets.Screen.
+    """
+    def __init__(self, x, y, digits, rows=2, value='', first_slot=0,
+                 glyphs=None):
+        self.x = x
+        self.y = y
+        self.digits = digits
+        self.rows = rows
+        self.font = FONT_4 if rows == 4 else FONT_2
+        self.first_slot = first_slot
+        self.glyphs = glyphs
+        # The glyphs the font uses, in the order they go into CGRAM.
+        self._needed = [i for i in range(8)
+                        if any(i in cells for cells in self.font.values())]
+        if glyphs is not None:
+            for i in self._needed:
+                glyphs.define(SEGMENT_NAMES[i], SEGMENT_GLYPHS[i], '#')
+        self._codes = None      # LCD character for each font cell index
+        self._layouts = {}      # per character: one bytes object per row
+        self._shown = None
+        self.value = None
+        self.dirty = True
+        self.set(value)
+
+    def set(self, value):
+        """Changes the value shown: an int or a str. It is right aligned,
+        and only the last digits are shown if there are too many.
+        """
+        text = str(value)[-self.digits:]
+        text = ' ' * (self.digits - len(text)) + text
+        if text != self.value:
+            self.value = text
+            self.dirty = True
+
+    def invalidate(self):
+        """Makes the next render upload the glyphs again and draw every
+        digit, e.g. after the LCD has been reset or cleared.
+        """
+        self._codes = None
+        self._shown = None
+        self.dirty = True
+
+    def render(self, lcd):
+        """Writes the digits that changed since the last render."""
+        codes = self._glyph_codes(lcd)
+        if codes != self._codes:
+            # The glyphs moved to other slots: every digit needs redrawing.
+            self._codes = codes
+            self._layouts = {}
+            self._shown = None
+        self.dirty = False
+        text = self.value
+        shown = self._shown
+        self._shown = text
+        lcd.hal_begin_batch()
+        try:
+            i = 0
+            while i < self.digits:
+                if shown is not None and text[i] == shown[i]:
+                    i += 1
+                    continue
+                # Rewrite a run of changed digits one row at a time.
+                j = i + 1
+                while j < self.digits and (shown is None or text[j] != shown[j]):
+                    j += 1
+                for row in range(self.rows):
+                    data = b' '.join([self._layout(char)[row] for char in text[i:j]])
+                    lcd.write_at(self.x + 4 * i, self.y + row, data)
+                i = j
+        finally:
+            lcd.hal_end_batch()
+
+    def _layout(self, char):
+        """Returns the rows of LCD characters that draw char."""
+        layout = self._layouts.get(char)
+        if layout is None:
+            cells = self.font.get(char, self.font[' '])
+            codes = self._codes
+            layout = self._layouts[char] = [
+                bytes([codes[cell] for cell in cells[3 * row:3 * row + 3]])
+                for row in range(self.rows)]
+        return layout
+
+    def _glyph_codes(self, lcd):
+        """Makes sure the glyphs are in CGRAM and returns the LCD character
+        for every font cell index.
+        """
+        if self.glyphs is None and self._codes is not None:
+            return self._codes
+        codes = [0x20] * 8 + [BLOCK_CODE, 0x20]
+        if self.glyphs is not None:
+            for i in self._needed:
+                codes[i] = ord(self.glyphs.char(SEGMENT_NAMES[i]))
+            return codes
+        lcd.hal_begin_batch()
+        try:
+            for n, i in enumerate(self._needed):
+                slot = (self.first_slot + n) & 0x7
+                lcd.custom_char(slot, SEGMENT_GLYPHS[i])
+                codes[i] = slot
+        finally:
+            lcd.hal_end_batch()
+        return codes
@@ -0,0 +1,217 @@
+"""Shows text much larger than the LCD through a scrollable viewport.
+
+    text = TextBuffer(lcd.encode)
+    text.append(long_text, width=20)
+    view = Viewport(0, 0, 20, 4, text)
+    view.render(lcd)
+    view.scroll(1)
+    view.render(lcd)    # rewrites only the cells that changed
+"""
+from array import array
+from lcd_api import next_change, run_end
+
+
+def _encode(text):
+    return bytes([ord(char) & 0xff for char in text])
+
+
+class TextBuffer:
+    """Holds lines of text, encoded for the LCD and packed back to back in
+    one bytearray, with the offset at which each line ends in an array. A
+    line costs its length plus 4 bytes, so a thousand 20 character lines
+    of log take about 24 KB, where a list of str would take several times
+    that.
+
+    Lines may be any length; a Viewport shows part of them. encode turns
+    str into LCD character codes; pass LcdApi.encode of the LCD (or
+    I2cLcd.encode, for Cyrillic). bytes are stored as they are.
+
+    version goes up on every change, which is how viewports notice them.
+    """
+    def __init__(self, encode=None):
+        self.encode = encode or _encode
+        self._data = bytearray()
+        self._ends = array('I')
+        self.version = 0
+
+    def __len__(self):
+        return len(self._ends)
+
+    def line(self, index):
+        """Returns line index (negative counts from the end) as a
+        memoryview of the buffer, valid until the next change.
+        """
+        if index < 0:
+            index += len(self._ends)
+        start = self._ends[index - 1] if index else 0
+        return memoryview(self._data)[start:self._ends[index]]
+
+    def append(self, text, width=None):
+        """Adds text at the end, one line per line of text. With width set,
+        lines longer than width are wrapped at the last space that fits,
+        or cut if there is none, like a text editor would.
+        """
+        if isinstance(text, str):
+            text = self.encode(text)
+        for line in bytes(text).split(b'\n'):
+            while width and len(line) > width:
+                cut = line.rfind(b' ', 0, width + 1)
+                if cut <= 0:
+                    self._add(line[:width])
+                    line = line[width:]
+                else:
+                    self._add(line[:cut])
+                    line = line[cut + 1:]
+            self._add(line)
+        self.version += 1
+
+    def _add(self, line):
+        self._data.extend(line)
+        self._ends.append(len(self._data))
+
+    def set_line(self, index, text):
+        """Replaces line index with text. This moves every line after it,
+        so it suits edits such as moving a menu's selection marker, not
+        rewriting the whole buffer.
+        """
+        if isinstance(text, str):
+            text = self.encode(text)
+        ends = self._ends
+        if index < 0:
+            index += len(ends)
+        start = ends[index - 1] if index else 0
+        end = ends[index]
+        growth = len(text) - (end - start)
+        if growth:
+            self._data = self._data[:start] + text + self._data[end:]
+        else:
+            self._data[start:end] = text
+        for i in range(index, len(ends)):
+            ends[i] += growth
+        self.version += 1
+
+    def drop(self, count):
+        """Removes the first count lines, e.g. to keep a log from growing
+        without end.
+        """
+        count = min(count, len(self._ends))
+        if not count:
+            return
+        cut = self._ends[count - 1]
+        self._data = self._data[cut:]
+        self._ends = array('I', [end - cut for end in self._ends[count:]])
+        self.version += 1
+
+    def clear(self):
+        """Removes every line."""
+        self._data = bytearray()
+        self._ends = array('I')
+        self.version += 1
+
+
+class Viewport:
+    """Shows a rectangle of a TextBuffer, width characters wide and rows
+    high, on the LCD from (x, y). top and left are the first line and
+    column of the buffer shown; lines past the end of the buffer show as
+    blank.
+
+    Scrolling and changes to the buffer only mark the viewport dirty;
+    render() then rewrites the runs of cells that differ from what it
+    last drew, so scrolling a log by a line rewrites the characters that
+    actually change, not the whole screen. It follows the widget protocol
+    of lcd_widgets, so it can be put in a Screen.
+    """
+    def __init__(self, x, y, width, rows, buffer, top=0, left=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.rows = rows
+        self.buffer = buffer
+        self.top = top
+        self.left = left
+        self._row = bytearray(width)
+        self._shown = None
+        self._dirty = True
+        self._version = None
+
+    @property
+    def dirty(self):
+        return self._dirty or self._version != self.buffer.version
+
+    def scroll_to(self, top, left=None):
+        """Shows the buffer from line top (and column left, if given) on,
+        keeping top within the buffer.
+        """
+        top = max(0, min(top, len(self.buffer) - self.rows))
+        if left is None:
+            left = self.left
+        if (top, left) != (self.top, self.left):
+            self.top = top
+            self.left = max(left, 0)
+            self._dirty = True
+
+    def scroll(self, lines, columns=0):
+        """Scrolls down by lines (up if negative) and right by columns."""
+        self.scroll_to(self.top + lines, self.left + columns)
+
+    def scroll_to_end(self):
+        """Scrolls so the last line of the buffer is on the bottom row."""
+        self.scroll_to(len(self.buffer))
+
+    def show_line(self, index):
+        """Scrolls as little as needed for line index to be shown."""
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.rows:
+            self.scroll_to(index - self.rows + 1)
+
+    def invalidate(self):
+        """Makes the next render draw every cell, e.g. after the screen
+        has been cleared.
+        """
+        self._shown = None
+        self._dirty = True
+
+    def render(self, lcd):
+        """Writes the cells that changed since the last render."""
+        self._dirty = False
+        self._version = self.buffer.version
+        width = self.width
+        full = self._shown is None
+        if full:
+            # What each row shows.
+            self._shown = [bytearray(width) for _ in range(self.rows)]
+        lcd.hal_begin_batch()
+        try:
+            for r in range(self.rows):
+                row = self._fill_row(self.top + r)
+                if full:
+                    self._write_run(lcd, r, 0, width - 1)
+                    continue
+                shown = self._shown[r]
+                x = next_change(row, shown, 0, width)
+                while x >= 0:
+                    last = run_end(row, shown, x, width)
+                    self._write_run(lcd, r, x, last)
+                    x = next_change(row, shown, last + 1, width)
+        finally:
+            lcd.hal_end_batch()
+
+    def _fill_row(self, index):
+        """Puts the visible part of line index, padded with spaces, in the
+        row buffer and returns it.
+        """
+        row = self._row
+        count = 0
+        if index < len(self.buffer):
+            line = self.buffer.line(index)[self.left:self.left + self.width]
+            count = len(line)
+            row[:count] = line
+        for i in range(count, self.width):
+            row[i] = 0x20
+        return row
+
+    def _write_run(self, lcd, r, start, last):
+        data = bytes(self._row[start:last + 1])
+        self._shown[r][start:last + 1] = data
+        lcd.write_at(self.x + start, self.y + r, data)
@@ -0,0 +1,200 @@
+"""Turns an LCD into a scrolling console for log output.
+
+    console = Console(lcd)
+    print('boot ok', file=console)
+    while True:
+        ...
+        console.service()
+"""
+try:
+    import io
+except ImportError:
+    import uio as io
+from lcd_api import next_change, run_end
+from lcd_time import ticks_ms, ticks_diff
+
+
+class Console(io.IOBase):
+    """A stream that shows the last lines written to it on rows lines of
+    the LCD from line y on, scrolling up as new lines arrive rather than
+    wrapping back to the top like putchar does.
+
+    write() only appends to a ring buffer of the last history lines, one
+    bytearray of history x num_columns characters, and never touches the
+    bus, so logging at any rate does not wait for the LCD. service(),
+    called from the main loop, redraws at most max_fps times a second: a
+    burst of lines written in between costs one redraw of the latest
+    state, and the redraw writes only the cells that differ from what is
+    on the LCD.
+
+    It can be passed to print(file=...), and os.dupterm(console) mirrors
+    the REPL to it: dupterm only takes streams derived from io.IOBase.
+    Text is encoded with lcd.encode; bytes (as dupterm writes) must
+    already be encoded for the LCD, which holds for ASCII. Lines longer
+    than the LCD wrap onto the next row, '\\r' goes back to the start of
+    the line and other control characters are dropped.
+    """
+    def __init__(self, lcd, y=0, rows=None, history=32, max_fps=10):
+        if max_fps < 1:
+            raise ValueError('max_fps must be at least 1')
+        self.lcd = lcd
+        self.y = y
+        self.rows = rows or lcd.num_lines - y
+        self.width = lcd.num_columns
+        self.history = max(history, self.rows)
+        self.interval_ms = 1000 // max_fps
+        self._ring = bytearray(b' ' * (self.history * self.width))
+        self._head = 0          # ring line being written
+        self._count = 1         # lines held, including the one at _head
+        self._col = 0
+        # A newline is only carried out when the next character arrives,
+        # so the bottom row shows the last line rather than an empty one.
+        self._newline = False
+        self._shown = None
+        self._last_frame = None
+        self.offset = 0
+        self.dirty = True
+        self.writes = 0
+        self.frames = 0
+
+    def write(self, data):
+        """Appends data (str or bytes) and returns its length."""
+        if isinstance(data, str):
+            text = self.lcd.encode(data)
+        else:
+            text = data
+        ring = self._ring
+        width = self.width
+        col = self._col
+        newline = self._newline
+        pos = self._head * width
+        for code in text:
+            if code == 0x0a:
+                if newline:
+                    self._new_line()
+                    pos = self._head * width
+                newline = True
+                col = 0
+                continue
+            if code == 0x0d:
+                col = 0
+                continue
+            if code == 0x09:
+                code = 0x20
+            elif code < 0x20:
+                continue
+            if newline or col == width:
+                self._new_line()
+                pos = self._head * width
+                newline = False
+                col = 0
+            ring[pos + col] = code
+            col += 1
+        self._col = col
+        self._newline = newline
+        self.writes += 1
+        self.dirty = True
+        return len(data)
+
+    def readinto(self, buf):
+        # Needed by os.dupterm; the console has no input.
+        return None
+
+    def _new_line(self):
+        self._head = (self._head + 1) % self.history
+        if self._count < self.history:
+            self._count += 1
+        start = self._head * self.width
+        ring = self._ring
+        for i in range(start, start + self.width):
+            ring[i] = 0x20
+
+    def line(self, back):
+        """Returns the line back lines before the last one (0 for the line
+        being written), as a memoryview of the ring buffer, or None if the
+        history holds no such line.
+        """
+        if back >= self._count:
+            return None
+        start = ((self._head - back) % self.history) * self.width
+        return memoryview(self._ring)[start:start + self.width]
+
+    def scroll(self, lines):
+        """Shows older lines: lines up (down if negative) from what is
+        shown, stopping at the newest and the oldest line held. At offset 0
+        the console follows new lines.
+        """
+        offset = max(0, min(self.offset + lines, self._count - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.dirty = True
+
+    def clear(self):
+        """Forgets every line."""
+        ring = self._ring
+        for i in range(len(ring)):
+            ring[i] = 0x20
+        self._head = 0
+        self._count = 1
+        self._col = 0
+        self._newline = False
+        self.offset = 0
+        self.dirty = True
+
+    def invalidate(self):
+        """Makes the next redraw write every cell, e.g. after the screen
+        has been cleared.
+        """
+        self._shown = None
+        self.dirty = True
+
+    def service(self):
+        """Redraws the console if anything changed and the frame interval
+        has passed. Returns True if it redrew.
+        """
+        if not self.dirty:
+            return False
+        now = ticks_ms()
+        if (self._last_frame is not None and
+                ticks_diff(now, self._last_frame) < self.interval_ms):
+            return False
+        self._last_frame = now
+        self.refresh()
+        return True
+
+    def refresh(self):
+        """Redraws the console right away, writing the runs of cells that
+        changed since the last redraw.
+        """
+        lcd = self.lcd
+        width = self.width
+        full = self._shown is None
+        if full:
+            # What each row shows.
+            self._shown = [bytearray(width) for _ in range(self.rows)]
+        self.dirty = False
+        self.frames += 1
+        blank = b' ' * width
+        lcd.hal_begin_batch()
+        try:
+            for r in range(self.rows):
+                row = self.line(self.offset + self.rows - 1 - r)
+                if row is None:
+                    row = blank
+                if full:
+                    self._write_run(r, row, 0, width - 1)
+                    continue
+                shown = self._shown[r]
+                x = next_change(row, shown, 0, width)
+                while x >= 0:
+                    last = run_end(row, shown, x, width)
+                    self._write_run(r, row, x, last)
+                    x = next_change(row, shown, last + 1, width)
+            lcd.flush()
+        finally:
+            lcd.hal_end_batch()
+
+    def _write_run(self, r, row, start, last):
+        data = bytes(row[start:last + 1])
+        self._shown[r][start:last + 1] = data
+        self.lcd.write_at(start, self.y + r, data)
@@ -0,0 +1,168 @@
+"""Shows Russian text on LCDs with the standard (A00, Japanese) character ROM.
+
+CYRILLIC_MAP in i2c_lcd needs a controller with a Cyrillic character ROM.
+On the common A00 ROM the letters that look like Latin ones are shown with
+those, and the rest are drawn from a bundled 5x8 font loaded into CGRAM.
+Only 8 such glyphs fit on the screen at a time, so CyrillicPlanner picks
+them per frame.
+"""
+
+# Cyrillic letters shown with the Latin letter that looks the same.
+LATIN_LOOKALIKES = {
+    'А': 'A', 'В': 'B', 'Е': 'E', 'К': 'K', 'М': 'M', 'Н': 'H', 'О': 'O',
+    'Р': 'P', 'С': 'C', 'Т': 'T', 'Х': 'X',
+    'а': 'a', 'е': 'e', 'о': 'o', 'р': 'p', 'с': 'c', 'у': 'y', 'х': 'x',
+}
+
+# 5x8 bitmaps of the other letters, one row per byte.
+CYRILLIC_GLYPHS = {
+    'Б': (0b11111, 0b10000, 0b10000, 0b11110, 0b10001, 0b10001, 0b11110, 0),
+    'Г': (0b11111, 0b10000, 0b10000, 0b10000, 0b10000, 0b10000, 0b10000, 0),
+    'Д': (0b00110, 0b01010, 0b01010, 0b01010, 0b01010, 0b11111, 0b10001, 0),
+    'Ё': (0b01010, 0b00000, 0b11111, 0b10000, 0b11110, 0b10000, 0b11111, 0),
+    'Ж': (0b10101, 0b10101, 0b10101, 0b01110, 0b10101, 0b10101, 0b10101, 0),
+    'З': (0b01110, 0b10001, 0b00001, 0b00110, 0b00001, 0b10001, 0b01110, 0),
+    'И': (0b10001, 0b10001, 0b10011, 0b10101, 0b11001, 0b10001, 0b10001, 0),
+    'Й': (0b01110, 0b10001, 0b10011, 0b10101, 0b11001, 0b10001, 0b10001, 0),
+    'Л': (0b00111, 0b01001, 0b01001, 0b01001, 0b01001, 0b01001, 0b10001, 0),
+    'П': (0b11111, 0b10001, 0b10001, 0b10001, 0b10001, 0b10001, 0b10001, 0),
+    'У': (0b10001, 0b10001, 0b10001, 0b01111, 0b00001, 0b10001, 0b01110, 0),
+    'Ф': (0b00100, 0b01110, 0b10101, 0b10101, 0b10101, 0b01110, 0b00100, 0),
+    'Ц': (0b10010, 0b10010, 0b10010, 0b10010, 0b10010, 0b10010, 0b11111,
+          0b00001),
+    'Ч': (0b10001, 0b10001, 0b10001, 0b01111, 0b00001, 0b00001, 0b00001, 0),
+    'Ш': (0b10101, 0b10101, 0b10101, 0b10101, 0b10101, 0b10101, 0b11111, 0),
+    'Щ': (0b10101, 0b10101, 0b10101, 0b10101, 0b10101, 0b10101, 0b11111,
+          0b00001),
+    'Ъ': (0b11000, 0b01000, 0b01000, 0b01110, 0b01001, 0b01001, 0b01110, 0),
+    'Ы': (0b10001, 0b10001, 0b10001, 0b11001, 0b10101, 0b10101, 0b11001, 0),
+    'Ь': (0b10000, 0b10000, 0b10000, 0b11110, 0b10001, 0b10001, 0b11110, 0),
+    'Э': (0b01110, 0b10001, 0b00001, 0b00111, 0b00001, 0b10001, 0b01110, 0),
+    'Ю': (0b10010, 0b10101, 0b10101, 0b11101, 0b10101, 0b10101, 0b10010, 0),
+    'Я': (0b01111, 0b10001, 0b10001, 0b01111, 0b00101, 0b01001, 0b10001, 0),
+    'б': (0b00011, 0b01100, 0b10000, 0b11110, 0b10001, 0b10001, 0b01110, 0),
+    'в': (0, 0, 0b11110, 0b10001, 0b11110, 0b10001, 0b11110, 0),
+    'г': (0, 0, 0b11111, 0b10000, 0b10000, 0b10000, 0b10000, 0),
+    'д': (0, 0, 0b00110, 0b01010, 0b01010, 0b11111, 0b10001, 0),
+    'ё': (0b01010, 0, 0b01110, 0b10001, 0b11111, 0b10000, 0b01110, 0),
+    'ж': (0, 0, 0b10101, 0b10101, 0b01110, 0b10101, 0b10101, 0),
+    'з': (0, 0, 0b01110, 0b10001, 0b00110, 0b10001, 0b01110, 0),
+    'и': (0, 0, 0b10001, 0b10011, 0b10101, 0b11001, 0b10001, 0),
+    'й': (0b01010, 0b00100, 0b10001, 0b10011, 0b10101, 0b11001, 0b10001, 0),
+    'к': (0, 0, 0b10010, 0b10100, 0b11000, 0b10100, 0b10010, 0),
+    'л': (0, 0, 0b00111, 0b01001, 0b01001, 0b01001, 0b10001, 0),
+    'м': (0, 0, 0b10001, 0b11011, 0b10101, 0b10001, 0b10001, 0),
+    'н': (0, 0, 0b10001, 0b10001, 0b11111, 0b10001, 0b10001, 0),
+    'п': (0, 0, 0b11111, 0b10001, 0b10001, 0b10001, 0b10001, 0),
+    'т': (0, 0, 0b11111, 0b00100, 0b00100, 0b00100, 0b00100, 0),
+    'ф': (0, 0b00100, 0b01110, 0b10101, 0b10101, 0b01110, 0b00100, 0),
+    'ц': (0, 0, 0b10010, 0b10010, 0b10010, 0b10010, 0b11111, 0b00001),
+    'ч': (0, 0, 0b10001, 0b10001, 0b01111, 0b00001, 0b00001, 0),
+    'ш': (0, 0, 0b10101, 0b10101, 0b10101, 0b10101, 0b11111, 0),
+    'щ': (0, 0, 0b10101, 0b10101, 0b10101, 0b10101, 0b11111, 0b00001),
+    'ъ': (0, 0, 0b11000, 0b01000, 0b01110, 0b01001, 0b01110, 0),
+    'ы': (0, 0, 0b10001, 0b10001, 0b11101, 0b10011, 0b11101, 0),
+    'ь': (0, 0, 0b10000, 0b10000, 0b11110, 0b10001, 0b11110, 0),
+    'э': (0, 0, 0b01110, 0b10001, 0b00111, 0b10001, 0b01110, 0),
+    'ю': (0, 0, 0b10010, 0b10101, 0b11101, 0b10101, 0b10010, 0),
+    'я': (0, 0, 0b01111, 0b10001, 0b01111, 0b01001, 0b10001, 0),
+}
+
+# What letters are shown as when there is no CGRAM slot left for them: a
+# single character each, so the layout of the screen stays the same.
+TRANSLITERATION = {
+    'Б': 'B', 'Г': 'G', 'Д': 'D', 'Ё': 'E', 'Ж': 'Z', 'З': '3', 'И': 'I',
+    'Й': 'J', 'Л': 'L', 'П': 'P', 'У': 'U', 'Ф': 'F', 'Ц': 'C', 'Ч': '4',
+    'Ш': 'W', 'Щ': 'W', 'Ъ': "'", 'Ы': 'Y', 'Ь': "'", 'Э': 'E', 'Ю': 'U',
+    'Я': 'R',
+    'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ё': 'e', 'ж': 'z', 'з': '3',
+    'и': 'i', 'й': 'j', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'п': 'n',
+    'т': 't', 'ф': 'f', 'ц': 'c', 'ч': '4', 'ш': 'w', 'щ': 'w', 'ъ': "'",
+    'ы': 'y', 'ь': "'", 'э': 'e', 'ю': 'u', 'я': 'r',
+}
+
+
+class CyrillicPlanner:
+    """Encodes whole screens of Russian text for an LCD with the A00 ROM.
+
+    For every frame the planner counts the letters that need a CGRAM
+    glyph and gives the slots to the most frequent ones, keeping letters
+    that are already loaded where they are, so only glyphs new to the
+    frame are uploaded. The letters that do not get a slot are
+    transliterated (see TRANSLITERATION).
+
+    The planner uses count CGRAM slots from first_slot on and leaves the
+    others to other users, e.g. a GlyphCache.
+    """
+    def __init__(self, lcd, first_slot=0, count=8):
+        self.lcd = lcd
+        self.first_slot = first_slot
+        self._slots = [None] * count    # letter held by each slot
+        self.uploads = 0
+        self.transliterated = 0
+
+    def plan(self, lines):
+        """Loads the glyphs the frame lines (a list of str) needs and
+        returns the lines encoded for the LCD, as a list of bytes.
+        """
+        counts = {}
+        for line in lines:
+            for char in line:
+                if char in CYRILLIC_GLYPHS:
+                    counts[char] = counts.get(char, 0) + 1
+        slots = self._slots
+        # Most frequent first; on a tie, letters that are already loaded.
+        wanted = sorted(counts, key=lambda char: (-counts[char], char not in slots))
+        wanted = wanted[:len(slots)]
+        free = [i for i in range(len(slots)) if slots[i] not in wanted]
+        lcd = self.lcd
+        lcd.hal_begin_batch()
+        try:
+            for char in wanted:
+                if char not in slots:
+                    i = free.pop(0)
+                    slots[i] = char
+                    lcd.custom_char(self.first_slot + i, CYRILLIC_GLYPHS[char])
+                    self.uploads += 1
+        finally:
+            lcd.hal_end_batch()
+        codes = {}
+        for i in range(len(slots)):
+            if slots[i] is not None:
+                codes[slots[i]] = self.first_slot + i
+        return [self._encode(line, codes) for line in lines]
+
+    def show(self, lines):
+        """Plans the frame lines and writes them to the LCD, one string
+        per row starting at the top (see LcdApi.write_line).
+        """
+        lcd = self.lcd
+        lcd.hal_begin_batch()
+        try:
+            for y, data in enumerate(self.plan(lines)):
+                lcd.write_line(y, data)
+            lcd.flush()
+        finally:
+            lcd.hal_end_batch()
+
+    def invalidate(self):
+        """Forgets which glyphs are loaded, e.g. after another CGRAM user
+        wrote to the planner's slots or the LCD was reset.
+        """
+        self._slots = [None] * len(self._slots)
+
+    def _encode(self, line, codes):
+        data = bytearray(len(line))
+        for i, char in enumerate(line):
+            code = codes.get(char)
+            if code is None:
+                if char in TRANSLITERATION:
+                    self.transliterated += 1
+                    char = TRANSLITERATION[char]
+                else:
+                    char = LATIN_LOOKALIKES.get(char, char)
+                code = ord(char)
+                if code > 0x7f:
+                    code = ord('?')
+            data[i] = code
+        return bytes(data)
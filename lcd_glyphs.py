@@ -0,0 +1,138 @@
+"""Manages the 8 CGRAM slots of a HD44780 LCD as a cache of custom glyphs."""
+
+# A few ready made 5x8 glyphs, one row per byte.
+GLYPHS = {
+    'heart': (0b00000, 0b01010, 0b11111, 0b11111,
+              0b11111, 0b01110, 0b00100, 0b00000),
+    'smiley': (0b00000, 0b01010, 0b00000, 0b00000,
+               0b10001, 0b01110, 0b00000, 0b00000),
+    'arrow_up': (0b00100, 0b01110, 0b11111, 0b00100,
+                 0b00100, 0b00100, 0b00100, 0b00000),
+    'arrow_down': (0b00100, 0b00100, 0b00100, 0b00100,
+                   0b11111, 0b01110, 0b00100, 0b00000),
+}
+
+
+class GlyphCache:
+    """Hands out CGRAM characters for named glyphs, uploading them on demand.
+
+    The cache remembers the bitmap held by each of the 8 CGRAM slots, so a
+    glyph that is already loaded costs no CGRAM traffic, and slots are
+    reused least recently used first once all 8 are taken. A slot is never
+    evicted while its character is visible. In framebuffer mode the cache
+    checks the screen (see LcdApi.cgram_in_use) and never evicts a slot
+    handed out since the last call to new_frame. Otherwise it cannot see
+    the screen, so a slot handed out stays taken until release frees it.
+
+    If no slot can be freed, char returns the glyph's fallback text.
+    """
+    def __init__(self, lcd):
+        self.lcd = lcd
+        self.glyphs = {}
+        self.fallbacks = {}
+        for name in GLYPHS:
+            self.define(name, GLYPHS[name])
+        self._slots = [None] * 8    # bitmap held by each slot, if known
+        self._stamps = [0] * 8      # when each slot was last used
+        self._clock = 0
+        self._used = 0              # slots handed out since new_frame
+        self._held = 0              # slots handed out and not released
+        self.hits = 0
+        self.uploads = 0
+
+    def define(self, name, bitmap, fallback='?'):
+        """Adds (or replaces) a named glyph. fallback is shown instead if
+        no CGRAM slot is available for it.
+        """
+        self.glyphs[name] = bytes(bitmap)
+        self.fallbacks[name] = fallback
+
+    def char(self, name):
+        """Returns the character that displays the named glyph, loading
+        it into CGRAM if needed.
+        """
+        slot = self._slot_for(self.glyphs[name])
+        if slot < 0:
+            return self.fallbacks[name]
+        return chr(slot)
+
+    def load(self, location, bitmap):
+        """Puts bitmap in a specific CGRAM slot, like LcdApi.custom_char,
+        but sends nothing if the slot already holds it.
+        """
+        location &= 0x7
+        bitmap = bytes(bitmap)
+        if self._slots[location] == bitmap:
+            self.hits += 1
+        else:
+            self._upload(location, bitmap)
+        self._touch(location)
+
+    def new_frame(self):
+        """Tells the cache that glyphs handed out so far are no longer
+        needed unless they are still on the screen.
+        """
+        self._used = 0
+
+    def release(self, name=None):
+        """Tells the cache that the named glyph (every glyph if name is
+        None) is no longer on the screen, so its slot may be reused. Only
+        needed when the LCD is not in framebuffer mode.
+        """
+        if name is None:
+            self._held = 0
+            return
+        bitmap = self.glyphs[name]
+        for slot in range(8):
+            if self._slots[slot] == bitmap:
+                self._held &= ~(1 << slot)
+
+    def invalidate(self):
+        """Forgets what the CGRAM slots hold, e.g. after the LCD has been
+        reset or custom_char was called directly.
+        """
+        self._slots = [None] * 8
+
+    def _slot_for(self, bitmap):
+        slots = self._slots
+        for slot in range(8):
+            if slots[slot] == bitmap:
+                self.hits += 1
+                self._touch(slot)
+                return slot
+        slot = self._victim()
+        if slot >= 0:
+            self._upload(slot, bitmap)
+            self._touch(slot)
+        return slot
+
+    def _victim(self):
+        """Returns the slot to load a new glyph into, or -1 if every slot
+        is in use.
+        """
+        busy = self._used
+        on_screen = self.lcd.cgram_in_use()
+        if on_screen is None:
+            busy |= self._held
+        else:
+            busy |= on_screen
+        victim = -1
+        for slot in range(8):
+            if busy & (1 << slot):
+                continue
+            if self._slots[slot] is None:
+                return slot
+            if victim < 0 or self._stamps[slot] < self._stamps[victim]:
+                victim = slot
+        return victim
+
+    def _upload(self, slot, bitmap):
+        self.lcd.custom_char(slot, bitmap)
+        self._slots[slot] = bitmap
+        self.uploads += 1
+
+    def _touch(self, slot):
+        self._clock += 1
+        self._stamps[slot] = self._clock
+        self._used |= 1 << slot
+        self._held |= 1 << slot
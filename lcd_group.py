@@ -0,0 +1,103 @@
+"""Drives several PCF8574 I2C LCDs that share one I2C bus."""
+from i2c_lcd import I2cLcd, clear_all, power_up
+from lcd_time import ticks_us, ticks_diff
+
+
+class DisplayGroup:
+    """Owns an I2C bus with up to eight LCDs on it (PCF8574 addresses
+    0x20 - 0x27) and shares the bus fairly between them.
+
+    All LCDs are powered up and cleared together, so the power up, reset
+    and clear delays are paid once for the whole group. Each LCD runs in
+    framebuffer mode: draw on group.lcd(index) (or through
+    write_at/write_line here) and call step() or flush(). Flushing goes
+    round robin one dirty line at a time, so a full redraw of one panel
+    does not hold up small updates on the others.
+
+    The latency of an update is measured from the first write to a panel
+    (or the first flush step that saw it, for writes made directly on the
+    panel) until the panel has been fully flushed.
+    """
+    def __init__(self, i2c, i2c_addrs, num_lines, num_columns):
+        self.i2c = i2c
+        power_up(i2c, i2c_addrs, num_lines=num_lines)
+        clear_all(i2c, i2c_addrs)
+        self.panels = []
+        for addr in i2c_addrs:
+            # Already cleared, so warm: no clear and wait of its own.
+            panel = I2cLcd(i2c, addr, num_lines, num_columns, reset=False,
+                           warm=True)
+            panel.framebuffer_on()
+            self.panels.append(panel)
+        count = len(self.panels)
+        self._next = 0
+        self._dirty_since = [None] * count
+        self.updates = [0] * count
+        self.last_latency_us = [0] * count
+        self.max_latency_us = [0] * count
+
+    def lcd(self, index):
+        """Returns the I2cLcd of one panel."""
+        return self.panels[index]
+
+    def write_at(self, index, cursor_x, cursor_y, text):
+        """Writes text on one panel; see LcdApi.write_at."""
+        self._mark(index)
+        self.panels[index].write_at(cursor_x, cursor_y, text)
+
+    def write_line(self, index, cursor_y, text):
+        """Replaces a line on one panel; see LcdApi.write_line."""
+        self._mark(index)
+        self.panels[index].write_line(cursor_y, text)
+
+    def _mark(self, index):
+        if self._dirty_since[index] is None:
+            self._dirty_since[index] = ticks_us()
+
+    def step(self):
+        """Flushes one dirty line of the next panel in turn. Returns False
+        if there was nothing left to flush.
+        """
+        count = len(self.panels)
+        for k in range(count):
+            index = (self._next + k) % count
+            panel = self.panels[index]
+            dirty = panel.dirty_lines()
+            if not dirty:
+                # Writes that changed nothing do not count as an update.
+                self._dirty_since[index] = None
+                continue
+            self._mark(index)
+            line = 0
+            while not dirty & (1 << line):
+                line += 1
+            panel.flush_line(line)
+            if dirty == 1 << line:
+                self._done(index)
+            self._next = (index + 1) % count
+            return True
+        return False
+
+    def flush(self):
+        """Flushes every panel."""
+        while self.step():
+            pass
+
+    def _done(self, index):
+        latency = ticks_diff(ticks_us(), self._dirty_since[index])
+        self._dirty_since[index] = None
+        self.updates[index] += 1
+        self.last_latency_us[index] = latency
+        if latency > self.max_latency_us[index]:
+            self.max_latency_us[index] = latency
+
+    def stats(self):
+        """Returns the update counters and latencies of every panel, as a
+        list of dicts.
+        """
+        return [{
+            'addr': panel.i2c_addr,
+            'updates': self.updates[i],
+            'last_latency_us': self.last_latency_us[i],
+            'max_latency_us': self.max_latency_us[i],
+        } for i, panel in enumerate(self.panels)]
@@ -0,0 +1,96 @@
+"""Scrolls text across a HD44780 LCD by shifting the display."""
+
+
+class Marquee:
+    """Scrolls text along a row of an LCD, ticker style, with display
+    shift commands instead of rewriting the row on every step.
+
+    Each DDRAM line of the HD44780 holds 40 characters (80 on a one line
+    display) and the display shows a window of it that a shift moves along,
+    wrapping around at the end of the line. The marquee loads its text into
+    the line once, after which each step() costs a single command. Text
+    that does not fit in the line is loaded as the line scrolls: the
+    positions that have scrolled out of view are refilled in one run just
+    before they come back into view.
+
+    A shift moves the whole display, so the other rows scroll along with
+    the marquee. On four line displays rows 0 and 2 (and rows 1 and 3)
+    share a DDRAM line, so the other row of the pair shows another part of
+    the text. The text is written straight to DDRAM, also in framebuffer
+    mode, so leave the marquee's line alone while it runs; LcdApi.clear or
+    LcdApi.return_home undo the shift afterwards.
+
+    gap is the number of spaces shown between the end of the text and its
+    start, as the text goes round.
+    """
+    def __init__(self, lcd, text, cursor_y=0, gap=4):
+        self.lcd = lcd
+        self.cursor_y = cursor_y
+        self.gap = gap
+        self.size = lcd.ddram_line_length()
+        # How far past the left edge of the row the line is on screen. On
+        # four line displays the other row of the pair shows the positions
+        # after the marquee's row, or those before it (which the line
+        # reaches last as it wraps around).
+        visible = lcd.num_columns
+        if lcd.num_lines > 2:
+            visible = 2 * visible if cursor_y < 2 else self.size
+        self.visible = min(visible, self.size)
+        self._buf = bytearray(self.size)
+        self.set_text(text)
+
+    def set_text(self, text):
+        """Replaces the text, which starts again from the left edge of the
+        row. text may also be bytes that are already encoded for the LCD.
+        """
+        lcd = self.lcd
+        if isinstance(text, str):
+            text = lcd.encode(text)
+        self.text = bytes(text) + b' ' * self.gap
+        # The text index shown at the left edge of the row, and the first
+        # one that is not in DDRAM yet. Index i goes in line position
+        # (_origin + i) % size.
+        self._pos = 0
+        self._loaded = 0
+        start = lcd.num_columns if self.cursor_y & 2 else 0
+        self._origin = (start + lcd.display_shift) % self.size
+        self._fill(self.size)
+
+    def step(self):
+        """Scrolls the text one position to the left."""
+        lcd = self.lcd
+        self._pos += 1
+        lcd.hal_begin_batch()
+        try:
+            lcd.scroll_display_left()
+            if self._pos + self.visible > self._loaded:
+                self._fill(self._pos + self.size)
+        finally:
+            lcd.hal_end_batch()
+
+    def _fill(self, end):
+        """Loads the text up to index end into DDRAM, over positions that
+        hold text which has already scrolled past.
+        """
+        text = self.text
+        period = len(text)
+        size = self.size
+        i = self._loaded
+        self._loaded = end
+        if i >= size and size % period == 0:
+            # The text repeats every line length: DDRAM already holds it.
+            return
+        lcd = self.lcd
+        buf = self._buf
+        line = 0x40 if self.cursor_y & 1 and size == 40 else 0
+        lcd.hal_begin_batch()
+        try:
+            while i < end:
+                pos = (self._origin + i) % size
+                count = min(end - i, size - pos)
+                for k in range(count):
+                    buf[k] = text[(i + k) % period]
+                lcd.write_ddram(line + pos, buf, 0, count)
+                i += count
+        finally:
+            lcd.hal_end_batch()
@@ -0,0 +1,89 @@
+"""Provides a rate-limited refresh scheduler for LcdApi displays."""
+from lcd_time import ticks_ms, ticks_diff
+
+
+class RefreshScheduler:
+    """Commits screen updates to an LCD at most max_fps times a second.
+
+    update() and update_line() can be called at any rate; they only record
+    the latest text for a region (a start position on the screen). service()
+    is meant to be called from the main loop: once the frame interval has
+    passed it writes the pending regions and flushes the LCD, so the bus is
+    used for at most max_fps frames a second however fast updates arrive.
+
+    Updates to a region that is still pending replace the older text, which
+    is counted as dropped. Updates committed in the same frame as another
+    update are counted as coalesced.
+    """
+    def __init__(self, lcd, max_fps=10):
+        if max_fps < 1:
+            raise ValueError('max_fps must be at least 1')
+        self.lcd = lcd
+        self.interval_ms = 1000 // max_fps
+        self._pending = {}
+        self._order = []
+        self._last_commit = None
+        self.submitted = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.frames = 0
+
+    def update(self, cursor_x, cursor_y, text):
+        """Sets the text of the region starting at the indicated position;
+        see LcdApi.write_at.
+        """
+        self._submit((cursor_x, cursor_y), text, False)
+
+    def update_line(self, cursor_y, text):
+        """Sets the text of a whole line; see LcdApi.write_line."""
+        self._submit((0, cursor_y), text, True)
+
+    def _submit(self, key, text, whole_line):
+        self.submitted += 1
+        if key in self._pending:
+            self.dropped += 1
+            # Move it to the end so it still wins over regions it overlaps.
+            self._order.remove(key)
+        self._pending[key] = (text, whole_line)
+        self._order.append(key)
+
+    def service(self):
+        """Commits the pending updates if the frame interval has passed.
+        Returns True if a frame was committed.
+        """
+        if not self._order:
+            return False
+        now = ticks_ms()
+        if (self._last_commit is not None and
+                ticks_diff(now, self._last_commit) < self.interval_ms):
+            return False
+        self._last_commit = now
+        self.commit()
+        return True
+
+    def commit(self):
+        """Writes the pending updates to the LCD right away."""
+        lcd = self.lcd
+        pending = self._pending
+        for key in self._order:
+            text, whole_line = pending[key]
+            if whole_line:
+                lcd.write_line(key[1], text)
+            else:
+                lcd.write_at(key[0], key[1], text)
+        lcd.flush()
+        if self._order:
+            self.frames += 1
+            self.coalesced += len(self._order) - 1
+        self._pending = {}
+        self._order = []
+
+    def stats(self):
+        """Returns the scheduler counters as a dict."""
+        return {
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'frames': self.frames,
+            'pending': len(self._order),
+        }
@@ -0,0 +1,443 @@
+"""Simulates a HD44780 LCD on a PCF8574 I2C backpack, for running the
+drivers on a PC (CPython) without hardware.
+
+    bus = SimulatedI2C()
+    backpack = bus.attach(0x27)
+    lcd = I2cLcd(bus, 0x27, 4, 20)
+    lcd.putstr("Hello")
+    print(backpack.lcd.screen(4, 20))
+    assert not bus.violations
+"""
+from lcd_time import ticks_us
+
+# PCF8574 pin assignment, as used by i2c_lcd.
+PIN_RS = 0x01
+PIN_RW = 0x02
+PIN_E = 0x04
+PIN_BACKLIGHT = 0x08
+
+# HD44780 timing, in usec (datasheet values for Vcc = 4.5 - 5.5 V).
+POWER_ON_US = 15000     # from power up to the first instruction
+RESET_1_US = 4100       # after the first "function set 8 bit" nibble
+RESET_2_US = 100        # after the second one
+CLEAR_US = 1520         # clear display and return home
+EXEC_US = 37            # every other instruction
+DATA_US = 41            # DDRAM/CGRAM writes (37 usec + 4 usec tADD)
+
+
+class SimulatedHD44780:
+    """Models the state of a HD44780 controller driven in 4-bit mode.
+
+    Nibbles are fed in with latch(); the model keeps DDRAM, CGRAM, the
+    address counter, display shift and control flags, and records a timing
+    violation whenever a nibble arrives while the controller is still busy
+    with the previous instruction.
+    """
+    def __init__(self):
+        self.ddram = bytearray(b' ' * 0x80)
+        self.cgram = bytearray(0x40)
+        self.addr = 0
+        self.in_cgram = False
+        self.increment = True
+        self.shift_on_write = False
+        self.display_on = False
+        self.cursor_on = False
+        self.blink_on = False
+        self.two_lines = False
+        self.shift = 0
+        self.eight_bit = True
+        self._high = None
+        self._read_low = None   # second nibble of a 4-bit read
+        self._resets = 0        # function sets seen during power-up init
+        self._initialised = False
+        # Set by the switch to 4-bit mode during init, until the function
+        # set that must come next.
+        self._needs_function_set = False
+        self.busy_until = None
+        self.violations = []
+        self.commands = 0
+        self.data_writes = 0
+
+    def latch(self, rs, nibble, now, low=0):
+        """Handles a falling edge of E with nibble on D4-D7 at time now
+        (usec). low is what is on D0-D3, which only counts in 8-bit mode
+        (and is 0 if they are not wired).
+        """
+        if self.busy_until is not None and now < self.busy_until:
+            self.violations.append((now, 'busy for another %d usec' %
+                                    (self.busy_until - now)))
+        if self.eight_bit:
+            # Each transfer is a whole instruction; with D0-D3 not wired
+            # the low bits read as zero.
+            self._execute(rs, (nibble << 4) | low, now)
+        elif self._high is None:
+            self._high = nibble
+        else:
+            byte = (self._high << 4) | nibble
+            self._high = None
+            self._execute(rs, byte, now)
+
+    def read(self, rs, now):
+        """Handles a rising edge of E with RW high at time now (usec), and
+        returns the nibble the controller then drives onto D4-D7: the busy
+        flag and address counter with rs low, the next data byte with rs
+        high.
+        """
+        if self._read_low is not None:
+            nibble = self._read_low
+            self._read_low = None
+            return nibble
+        busy = self.busy_until is not None and now < self.busy_until
+        if rs:
+            if busy:
+                self.violations.append((now, 'data read while busy'))
+            if self.in_cgram:
+                byte = self.cgram[self.addr & 0x3f]
+            else:
+                byte = self.ddram[self.addr]
+            self._move(1 if self.increment else -1)
+            self.busy_until = now + DATA_US
+        else:
+            byte = (0x80 if busy else 0) | self.addr
+        if not self.eight_bit:
+            self._read_low = byte & 0x0f
+        return byte >> 4
+
+    def _execute(self, rs, byte, now):
+        if self._needs_function_set and (rs or (byte & 0xe0) != 0x20):
+            # The function set has to follow the switch to 4-bit mode
+            # before anything else.
+            self.violations.append((now, '0x%02x sent before the function '
+                                    'set' % byte))
+            self._needs_function_set = False
+        if rs:
+            self.data_writes += 1
+            self._write(byte)
+            self.busy_until = now + DATA_US
+            return
+        self.commands += 1
+        exec_us = EXEC_US
+        if byte & 0x80:
+            self.addr = byte & 0x7f
+            self.in_cgram = False
+        elif byte & 0x40:
+            self.addr = byte & 0x3f
+            self.in_cgram = True
+        elif byte & 0x20:
+            if not self._initialised and self.eight_bit:
+                self._needs_function_set = not byte & 0x10
+            else:
+                self._needs_function_set = False
+            self.eight_bit = bool(byte & 0x10)
+            if self.eight_bit:
+                self._high = None
+            if self.eight_bit and not self._initialised and self._resets < 3:
+                # Initializing by instruction starts with three function
+                # sets to 8-bit mode, and the first two need longer waits.
+                self._resets += 1
+                if self._resets == 1:
+                    exec_us = RESET_1_US
+                elif self._resets == 2:
+                    exec_us = RESET_2_US
+            else:
+                self._initialised = True
+                self.two_lines = bool(byte & 0x08)
+        elif byte & 0x10:
+            if byte & 0x08:
+                self.shift += 1 if byte & 0x04 else -1
+            else:
+                self._move(1 if byte & 0x04 else -1)
+        elif byte & 0x08:
+            self.display_on = bool(byte & 0x04)
+            self.cursor_on = bool(byte & 0x02)
+            self.blink_on = bool(byte & 0x01)
+        elif byte & 0x04:
+            self.increment = bool(byte & 0x02)
+            self.shift_on_write = bool(byte & 0x01)
+        elif byte & 0x02:
+            self.addr = 0
+            self.in_cgram = False
+            self.shift = 0
+            exec_us = CLEAR_US
+        elif byte & 0x01:
+            for i in range(len(self.ddram)):
+                self.ddram[i] = 0x20
+            self.addr = 0
+            self.in_cgram = False
+            self.shift = 0
+            self.increment = True
+            exec_us = CLEAR_US
+        self.busy_until = now + exec_us
+
+    def _write(self, byte):
+        if self.in_cgram:
+            self.cgram[self.addr & 0x3f] = byte
+            self.addr = (self.addr + (1 if self.increment else -1)) & 0x3f
+            return
+        self.ddram[self.addr] = byte
+        self._move(1 if self.increment else -1)
+        if self.shift_on_write:
+            self.shift += -1 if self.increment else 1
+
+    def _move(self, step):
+        if self.in_cgram:
+            self.addr = (self.addr + step) & 0x3f
+        elif not self.two_lines:
+            self.addr = (self.addr + step) % 0x50
+        else:
+            # Two separate 40 character lines at 0x00 and 0x40.
+            line = self.addr & 0x40
+            pos = (self.addr & 0x3f) + step
+            if pos >= 0x28:
+                pos = 0
+                line ^= 0x40
+            elif pos < 0:
+                pos = 0x27
+                line ^= 0x40
+            self.addr = line | pos
+
+    def line_codes(self, row, num_columns):
+        """Returns the character codes visible on one row of a display
+        with the indicated width, taking the display shift into account.
+        """
+        codes = bytearray(num_columns)
+        if not self.two_lines:
+            # One 80 character line, which the display shift wraps round.
+            for x in range(num_columns):
+                codes[x] = self.ddram[(x - self.shift) % 0x50]
+            return codes
+        base = (0x40 if row & 1 else 0) + (num_columns if row & 2 else 0)
+        line = base & 0x40
+        for x in range(num_columns):
+            pos = ((base & 0x3f) + x - self.shift) % 0x28
+            codes[x] = self.ddram[line | pos]
+        return codes
+
+    def screen(self, num_lines, num_columns):
+        """Returns the text shown on the display as a list of strings, one
+        per line. CGRAM characters show up as chr(0) - chr(7).
+        """
+        return [bytes(self.line_codes(row, num_columns)).decode('latin-1')
+                for row in range(num_lines)]
+
+    def glyph(self, location):
+        """Returns the 5x8 bitmap in one CGRAM slot as a list of 8 strings
+        of '#' and '.'.
+        """
+        rows = self.cgram[(location & 0x7) * 8:(location & 0x7) * 8 + 8]
+        return [''.join('#' if row & (0x10 >> x) else '.' for x in range(5))
+                for row in rows]
+
+
+class SimulatedPCF8574:
+    """Models a PCF8574 backpack with a HD44780 LCD wired as in i2c_lcd.
+    With rw_wired False, RW of the LCD is tied to ground rather than
+    wired to P1, so the LCD can never be read and takes every E pulse as a
+    write.
+    """
+    def __init__(self, addr=0x27, rw_wired=True):
+        self.addr = addr
+        self.rw_wired = rw_wired
+        self.pins = 0xff
+        self.lcd = SimulatedHD44780()
+        self.backlight = False
+        self._lcd_out = 0x0f    # what the LCD drives onto D4-D7 in a read
+        self._rw = False        # RW as the LCD sees it
+
+    def write(self, byte, now):
+        """Sets the output pins to byte at time now (usec)."""
+        rw = self.rw_wired and bool(byte & PIN_RW)
+        if self.lcd.busy_until is None:
+            # Treat the first write as the moment the LCD was powered up.
+            # The pins come up high, so there is no edge to act on yet.
+            self.lcd.busy_until = now + POWER_ON_US
+        else:
+            if (self.pins & PIN_E) and not (byte & PIN_E) and not self._rw:
+                self.lcd.latch(self.pins & PIN_RS, self.pins >> 4, now)
+            if not (self.pins & PIN_E) and (byte & PIN_E) and rw:
+                self._lcd_out = self.lcd.read(byte & PIN_RS, now)
+        self._rw = rw
+        self.pins = byte
+        self.backlight = bool(byte & PIN_BACKLIGHT)
+
+    def read(self, now):
+        """Returns the state of the pins at time now (usec). While the LCD
+        is being read (RW and E high) it pulls D4-D7 low where its output
+        is 0; the PCF8574 outputs are weak pull ups when written high.
+        """
+        if (self.pins & PIN_E) and self._rw:
+            return self.pins & (0x0f | (self._lcd_out << 4))
+        return self.pins
+
+
+class SimulatedPin:
+    """A machine.Pin stand-in for an output pin. on_change, if given, is
+    called with the pin whenever its value changes.
+    """
+    def __init__(self, on_change=None):
+        self._value = 0
+        self._on_change = on_change
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        value = 1 if value else 0
+        if value != self._value:
+            self._value = value
+            if self._on_change is not None:
+                self._on_change(self)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    __call__ = value
+
+
+class SimulatedParallelLcd:
+    """Models a HD44780 LCD wired straight to GPIO pins, for gpio_lcd.
+
+    The pins are SimulatedPin objects: rs, rw, enable, d0 - d7 and
+    backlight. Pass d4 - d7 to GpioLcd for 4-bit mode and d0 - d7 for
+    8-bit mode. The LCD counts as powered up when this object is made.
+    clock returns the current time in usec and defaults to the real time.
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or ticks_us
+        self.lcd = SimulatedHD44780()
+        self.rs = SimulatedPin()
+        self.rw = SimulatedPin()
+        self.enable = SimulatedPin(self._enable_changed)
+        self.d = [SimulatedPin() for _ in range(8)]
+        self.d0, self.d1, self.d2, self.d3, self.d4, self.d5, self.d6, self.d7 = self.d
+        self.backlight = SimulatedPin()
+        # The LCD is powered up together with the board.
+        self.lcd.busy_until = self.clock() + POWER_ON_US
+
+    @property
+    def violations(self):
+        return self.lcd.violations
+
+    def _enable_changed(self, pin):
+        now = self.clock()
+        if pin.value() or self.rw.value():
+            return
+        bits = 0
+        for i in range(8):
+            bits |= self.d[i].value() << i
+        self.lcd.latch(self.rs.value(), bits >> 4, now, bits & 0x0f)
+
+
+class Simulated74HC595:
+    """Models a 74HC595 shift register driving a HD44780 LCD, for spi_lcd.
+
+    It stands in for the SPI bus as well: write() shifts bytes in, and the
+    outputs take the last byte shifted in on a rising edge of cs (RCLK).
+    The outputs are wired like the PCF8574 backpack (see SimulatedPCF8574).
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or ticks_us
+        self.outputs = SimulatedPCF8574()
+        self.lcd = self.outputs.lcd
+        self.cs = SimulatedPin(self._cs_changed)
+        self._shifted = 0
+        self.writes = 0
+
+    @property
+    def violations(self):
+        return self.lcd.violations
+
+    def write(self, buf):
+        for byte in buf:
+            self._shifted = byte
+        self.writes += 1
+
+    def _cs_changed(self, pin):
+        if pin.value():
+            self.outputs.write(self._shifted, self.clock())
+
+
+class SimulatedI2C:
+    """A machine.I2C stand-in with simulated devices attached.
+
+    Every transaction is recorded in transactions as (start usec, address,
+    bytes). Transactions are timed as if the bus ran at freq: one starts
+    either when it was issued or when the previous one finished on the bus,
+    whichever is later, and each byte takes 9 clock cycles.
+
+    clock returns the current time in usec and defaults to the real time.
+    On the real clock each transaction also takes its time on the bus
+    before it returns, as on hardware, so the driver's own sleeps start
+    when the traffic before them has reached the LCD. A virtual clock is
+    left for its owner to advance.
+    """
+    def __init__(self, freq=400000, clock=None):
+        self.freq = freq
+        self.clock = clock or ticks_us
+        self._blocking = clock is None
+        self.devices = {}
+        self.transactions = []
+        self._bus_free = None
+
+    def attach(self, addr=0x27, rw_wired=True):
+        """Adds a simulated PCF8574 backpack at addr and returns it."""
+        device = SimulatedPCF8574(addr, rw_wired)
+        self.devices[addr] = device
+        return device
+
+    @property
+    def violations(self):
+        """The timing violations of all attached LCDs."""
+        found = []
+        for device in self.devices.values():
+            found.extend(device.lcd.violations)
+        return found
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def _start(self, addr, data):
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(19)    # ENODEV, as MicroPython reports a NACK
+        now = self.clock()
+        if self._bus_free is not None and self._bus_free > now:
+            now = self._bus_free
+        self.transactions.append((now, addr, bytes(data)))
+        return device, now
+
+    def _byte_us(self):
+        return 9 * 1000000 / self.freq
+
+    def writeto(self, addr, buf, stop=True):
+        device, now = self._start(addr, buf)
+        byte_us = self._byte_us()
+        for i, byte in enumerate(buf):
+            device.write(byte, now + int((i + 2) * byte_us))
+        self._bus_free = now + int((len(buf) + 1) * byte_us) + 1
+        self._wait_bus()
+        return len(buf)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        device, now = self._start(addr, b'')
+        byte_us = self._byte_us()
+        data = bytes([device.read(now + int((i + 2) * byte_us))
+                      for i in range(nbytes)])
+        self._bus_free = now + int((nbytes + 1) * byte_us) + 1
+        self._wait_bus()
+        return data
+
+    def _wait_bus(self):
+        if self._blocking:
+            while self.clock() < self._bus_free:
+                pass
+
+    def readfrom_into(self, addr, buf, stop=True):
+        data = self.readfrom(addr, len(buf), stop)
+        for i in range(len(buf)):
+            buf[i] = data[i]
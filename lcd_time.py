@@ -0,0 +1,24 @@
+"""Provides the MicroPython time functions the drivers use, with stand-ins
+for running them on CPython (e.g. driving a fake I2C bus or the simulator
+in lcd_sim).
+"""
+try:
+    from time import sleep_ms, sleep_us, ticks_ms, ticks_us, ticks_diff
+except ImportError:
+    # Not MicroPython.
+    from time import sleep, perf_counter
+
+    def sleep_ms(msecs):
+        sleep(msecs / 1000)
+
+    def sleep_us(usecs):
+        sleep(usecs / 1000000)
+
+    def ticks_ms():
+        return int(perf_counter() * 1000)
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
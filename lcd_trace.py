@@ -0,0 +1,221 @@
+"""Counts and traces what an LCD driver sends over its bus."""
+from lcd_api import LcdApi
+from lcd_time import ticks_us, ticks_diff
+
+# Counters kept for every section, in this order.
+COUNTERS = ('commands', 'data_bytes', 'bus_writes', 'bus_reads', 'bus_bytes',
+            'bus_us', 'sleeps', 'sleep_us')
+_COMMANDS, _DATA, _WRITES, _READS, _BYTES, _BUS_US, _SLEEPS, _SLEEP_US = range(8)
+
+
+class _TracedBus:
+    """Stands in for the I2C bus of a traced LCD."""
+    def __init__(self, tracer, i2c):
+        self.tracer = tracer
+        self.i2c = i2c
+
+    def writeto(self, addr, buf, stop=True):
+        start = ticks_us()
+        result = self.i2c.writeto(addr, buf, stop)
+        self.tracer._bus(_WRITES, len(buf), ticks_diff(ticks_us(), start))
+        self.tracer._record(buf)
+        return result
+
+    def readfrom(self, addr, nbytes, stop=True):
+        start = ticks_us()
+        result = self.i2c.readfrom(addr, nbytes, stop)
+        self.tracer._bus(_READS, nbytes, ticks_diff(ticks_us(), start))
+        return result
+
+    def readfrom_into(self, addr, buf, stop=True):
+        start = ticks_us()
+        result = self.i2c.readfrom_into(addr, buf, stop)
+        self.tracer._bus(_READS, len(buf), ticks_diff(ticks_us(), start))
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.i2c, name)
+
+
+class BusTracer:
+    """Instruments one LCD: counts the commands and data bytes it sends,
+    the bus transactions and bytes that takes, the sleeps, and the time
+    spent blocked on the bus and in sleeps. With trace_bytes set, the
+    last trace_bytes bytes written to the bus (the raw PCF8574 pin states)
+    are also kept in a ring buffer; see trace().
+
+    Creating a tracer hooks it into the LCD instance, and remove() takes it
+    out again, so an LCD that is not traced runs the plain driver code.
+
+    Counts go to the section that is open, which lets the cost of a
+    refresh be put down to whatever caused it:
+
+        with tracer.section('clock'):
+            clock.render(lcd)
+
+    lcd_widgets.Screen opens a section for itself and one per widget it
+    renders. Commands and data bytes are counted as they are issued; in
+    batch mode the bus traffic is only sent when the outermost batch ends,
+    so it is counted in the section that is open then.
+    """
+    def __init__(self, lcd, trace_bytes=0):
+        self.lcd = lcd
+        self._ring = bytearray(trace_bytes) if trace_bytes else None
+        self._ring_pos = 0
+        self._ring_full = False
+        self.current = None
+        self._stack = []
+        self.reset()
+        self._install()
+
+    def _install(self):
+        lcd = self.lcd
+        tracer = self
+        hal_write_command = lcd.hal_write_command
+        hal_write_data = lcd.hal_write_data
+        hal_write_data_bulk = lcd.hal_write_data_bulk
+        hal_sleep_us = lcd.hal_sleep_us
+
+        def traced_write_command(cmd):
+            tracer._counters[_COMMANDS] += 1
+            hal_write_command(cmd)
+
+        def traced_write_data(data):
+            tracer._counters[_DATA] += 1
+            hal_write_data(data)
+
+        def traced_write_data_bulk(data, start=0, end=None):
+            tracer._counters[_DATA] += (len(data) if end is None else end) - start
+            hal_write_data_bulk(data, start, end)
+
+        def traced_sleep_us(usecs):
+            tracer._timed_sleep(hal_sleep_us, usecs)
+
+        lcd.hal_write_command = traced_write_command
+        lcd.hal_write_data = traced_write_data
+        lcd.hal_sleep_us = traced_sleep_us
+        self._hooks = ['hal_write_command', 'hal_write_data', 'hal_sleep_us']
+        # LcdApi's own hal_write_data_bulk passes each byte to the traced
+        # hal_write_data, which counts it already.
+        if type(lcd).hal_write_data_bulk is not LcdApi.hal_write_data_bulk:
+            lcd.hal_write_data_bulk = traced_write_data_bulk
+            self._hooks.append('hal_write_data_bulk')
+        if hasattr(lcd, '_wait_ready'):
+            wait_ready = lcd._wait_ready
+
+            def traced_wait_ready(msecs):
+                tracer._timed_sleep(wait_ready, msecs)
+
+            lcd._wait_ready = traced_wait_ready
+            self._hooks.append('_wait_ready')
+        self._i2c = getattr(lcd, 'i2c', None)
+        if self._i2c is not None:
+            lcd.i2c = _TracedBus(self, self._i2c)
+        lcd.tracer = self
+
+    def remove(self):
+        """Takes the tracer out of the LCD."""
+        lcd = self.lcd
+        for name in self._hooks:
+            delattr(lcd, name)
+        self._hooks = []
+        if self._i2c is not None:
+            lcd.i2c = self._i2c
+        lcd.tracer = None
+
+    def reset(self):
+        """Zeroes the counters and empties the trace."""
+        self._sections = {}
+        self._counters = self._section_counters(self.current)
+        self._ring_pos = 0
+        self._ring_full = False
+
+    def section(self, name):
+        """Counts everything up to the end of the with statement this is
+        used in towards section name.
+        """
+        self._stack.append(self.current)
+        self._enter(name)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._enter(self._stack.pop())
+
+    def _enter(self, name):
+        self.current = name
+        self._counters = self._section_counters(name)
+
+    def _section_counters(self, name):
+        counters = self._sections.get(name)
+        if counters is None:
+            counters = self._sections[name] = [0] * len(COUNTERS)
+        return counters
+
+    def _bus(self, kind, nbytes, usecs):
+        counters = self._counters
+        counters[kind] += 1
+        counters[_BYTES] += nbytes
+        counters[_BUS_US] += usecs
+
+    def _timed_sleep(self, sleep, arg):
+        # Any bus traffic while waiting (e.g. busy flag polls) is already
+        # counted as bus time.
+        counters = self._counters
+        bus_us = counters[_BUS_US]
+        start = ticks_us()
+        sleep(arg)
+        counters[_SLEEPS] += 1
+        counters[_SLEEP_US] += (ticks_diff(ticks_us(), start) -
+                                (counters[_BUS_US] - bus_us))
+
+    def _record(self, buf):
+        ring = self._ring
+        if ring is None:
+            return
+        size = len(ring)
+        pos = self._ring_pos
+        for byte in buf:
+            ring[pos] = byte
+            pos += 1
+            if pos == size:
+                pos = 0
+                self._ring_full = True
+        self._ring_pos = pos
+
+    def trace(self):
+        """Returns the traced bus bytes, oldest first."""
+        ring = self._ring
+        if ring is None:
+            return b''
+        if not self._ring_full:
+            return bytes(ring[:self._ring_pos])
+        return bytes(ring[self._ring_pos:] + ring[:self._ring_pos])
+
+    def summary(self):
+        """Returns the counters as a dict: the totals, plus the counters
+        of each section under 'sections' (work done outside any section is
+        under None). blocked_us adds up bus_us and sleep_us.
+        """
+        total = [0] * len(COUNTERS)
+        sections = {}
+        for name, counters in self._sections.items():
+            for i in range(len(COUNTERS)):
+                total[i] += counters[i]
+            if any(counters):
+                sections[name] = self._as_dict(counters)
+        result = self._as_dict(total)
+        result['sections'] = sections
+        if self._ring is not None:
+            result['traced_bytes'] = (len(self._ring) if self._ring_full
+                                      else self._ring_pos)
+        return result
+
+    def _as_dict(self, counters):
+        result = {}
+        for i, name in enumerate(COUNTERS):
+            result[name] = counters[i]
+        result['blocked_us'] = counters[_BUS_US] + counters[_SLEEP_US]
+        return result
@@ -0,0 +1,286 @@
+"""Provides retained mode widgets that redraw only the characters that change.
+
+    screen = Screen(lcd, (
+        ('title', Label(0, 0, 20, 'Boiler')),
+        ('temp', Number(0, 1, 8, '%5.1f C')),
+        ('level', Bar(0, 2, 20)),
+        ('time', Clock(12, 3)),
+    ))
+    screen.show()
+    while True:
+        screen['temp'].set(read_temp())
+        screen['time'].set(*time.localtime()[3:6])
+        screen.update()
+"""
+from lcd_api import next_change, run_end
+
+
+class Widget:
+    """Owns a rectangle of one row of the LCD, width characters wide from
+    (x, y), and keeps what it last drew there.
+
+    Subclasses return their contents from text(). render() compares it
+    with what the widget last drew and writes only the runs of characters
+    that differ, so a clock going from 12:34:59 to 12:35:00 rewrites
+    "5:00" and one going on to 12:35:01 rewrites a single character.
+
+    align is '<' (left), '>' (right) or '^' (centre), for text narrower
+    than the widget. Text that is too wide is clipped.
+    """
+    def __init__(self, x, y, width, align='<'):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.align = align
+        self.dirty = True
+        self._shown = None
+
+    def text(self):
+        """Returns what the widget shows, as a str (or encoded bytes)."""
+        return ''
+
+    def invalidate(self):
+        """Makes the next render draw the whole widget, e.g. after the
+        screen has been cleared.
+        """
+        self._shown = None
+        self.dirty = True
+
+    def render(self, lcd):
+        """Writes the characters that changed since the last render."""
+        data = self._cells(lcd)
+        shown = self._shown
+        self.dirty = False
+        self._shown = data
+        if shown is None:
+            lcd.write_at(self.x, self.y, data)
+            return
+        width = len(data)
+        x = next_change(data, shown, 0, width)
+        while x >= 0:
+            last = run_end(data, shown, x, width)
+            lcd.write_at(self.x + x, self.y, data[x:last + 1])
+            x = next_change(data, shown, last + 1, width)
+
+    def _cells(self, lcd):
+        """Returns text() encoded for the LCD, padded or clipped to the
+        width of the widget.
+        """
+        text = self.text()
+        if isinstance(text, str):
+            text = lcd.encode(text[:self.width])
+        else:
+            text = bytes(text[:self.width])
+        pad = self.width - len(text)
+        if not pad:
+            return text
+        if self.align == '>':
+            return b' ' * pad + text
+        if self.align == '^':
+            return b' ' * (pad // 2) + text + b' ' * (pad - pad // 2)
+        return text + b' ' * pad
+
+
+class Label(Widget):
+    """Shows a piece of text."""
+    def __init__(self, x, y, width, text='', align='<'):
+        Widget.__init__(self, x, y, width, align)
+        self.value = text
+
+    def set(self, text):
+        """Changes the text."""
+        if text != self.value:
+            self.value = text
+            self.dirty = True
+
+    def text(self):
+        return self.value
+
+
+class Number(Widget):
+    """Shows a value formatted with the % operator, right aligned by
+    default, e.g. Number(0, 1, 8, '%5.1f C').
+    """
+    def __init__(self, x, y, width, fmt='%d', value=0, align='>'):
+        Widget.__init__(self, x, y, width, align)
+        self.fmt = fmt
+        self.value = value
+
+    def set(self, value):
+        """Changes the value."""
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def text(self):
+        return self.fmt % self.value
+
+
+class Bar(Widget):
+    """Shows value as a horizontal bar filling the widget in proportion
+    to maximum.
+    """
+    def __init__(self, x, y, width, value=0, maximum=100, full='#', empty='-'):
+        Widget.__init__(self, x, y, width)
+        self.value = value
+        self.maximum = maximum
+        self.full = full
+        self.empty = empty
+
+    def set(self, value):
+        """Changes the value, which is clamped to 0 - maximum."""
+        value = min(max(value, 0), self.maximum)
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def text(self):
+        cells = self.value * self.width // self.maximum
+        return self.full * cells + self.empty * (self.width - cells)
+
+
+# 5x8 glyphs with the left 1 to 5 pixel columns filled, for SmoothBar.
+BAR_GLYPHS = tuple(bytes([(0x1f << (5 - n)) & 0x1f] * 8) for n in range(1, 6))
+
+
+class SmoothBar(Bar):
+    """A Bar with one step per pixel column rather than per character, so
+    a 20 character bar has 100 steps. It is drawn with custom characters
+    that have 1 to 5 columns filled, and as only the cells at the end of
+    the bar change, most updates rewrite one or two characters.
+
+    The glyphs go into CGRAM slots first_slot to first_slot + 4, uploaded
+    once with the first render. To share CGRAM with other users, pass a
+    lcd_glyphs.GlyphCache as glyphs instead: the bar then asks it for the
+    glyphs it shows on each render, which costs no traffic while they stay
+    loaded.
+    """
+    def __init__(self, x, y, width, value=0, maximum=100, first_slot=0,
+                 glyphs=None):
+        Bar.__init__(self, x, y, width, value, maximum)
+        self.first_slot = first_slot
+        self.glyphs = glyphs
+        self._loaded = False
+        if glyphs is not None:
+            for n in range(5):
+                glyphs.define('bar_%d' % (n + 1), BAR_GLYPHS[n],
+                              '#' if n > 1 else ' ')
+
+    def invalidate(self):
+        """See Widget.invalidate. Also uploads the glyphs again, e.g. after
+        the LCD has been reset.
+        """
+        Bar.invalidate(self)
+        self._loaded = False
+
+    def render(self, lcd):
+        if self.glyphs is None and not self._loaded:
+            lcd.hal_begin_batch()
+            try:
+                for n in range(5):
+                    lcd.custom_char(self.first_slot + n, BAR_GLYPHS[n])
+            finally:
+                lcd.hal_end_batch()
+            self._loaded = True
+        Bar.render(self, lcd)
+
+    def text(self):
+        columns = self.value * self.width * 5 // self.maximum
+        cells, part = divmod(columns, 5)
+        text = self._glyph(5) * cells if cells else b''
+        if part:
+            text += self._glyph(part)
+        return text + b' ' * (self.width - len(text))
+
+    def _glyph(self, columns):
+        """Returns the encoded character with columns filled columns."""
+        if self.glyphs is None:
+            return bytes([(self.first_slot + columns - 1) & 0x7])
+        return self.glyphs.char('bar_%d' % columns).encode()
+
+
+class Clock(Widget):
+    """Shows a time of day as HH:MM:SS, or HH:MM without seconds."""
+    def __init__(self, x, y, seconds=True):
+        Widget.__init__(self, x, y, 8 if seconds else 5)
+        self.seconds = seconds
+        self.value = (0, 0, 0)
+
+    def set(self, hours, minutes, seconds=0):
+        """Changes the time shown."""
+        value = (hours, minutes, seconds)
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def text(self):
+        if self.seconds:
+            return '%02d:%02d:%02d' % self.value
+        return '%02d:%02d' % self.value[:2]
+
+
+class Screen:
+    """Lays widgets out on an LCD and keeps it up to date.
+
+    layout is a sequence of (name, widget) pairs; widgets are drawn in
+    that order, so a later widget wins where two overlap. Change widgets
+    through screen[name] (or set()) and call update() to draw them. Only
+    widgets whose value changed are rendered, and of those only the
+    characters that changed are written, all in one batch (and one flush
+    in framebuffer mode).
+
+    If the LCD is traced (see lcd_trace.BusTracer), update() counts its
+    traffic in a section called name, and each widget's in a section
+    called name/widget name.
+    """
+    def __init__(self, lcd, layout, name='screen'):
+        self.lcd = lcd
+        self.name = name
+        self.widgets = {}
+        self._order = []
+        for widget_name, widget in layout:
+            self.widgets[widget_name] = widget
+            self._order.append((widget_name, widget))
+
+    def __getitem__(self, name):
+        return self.widgets[name]
+
+    def set(self, name, *args):
+        """Calls set() of the named widget with args."""
+        self.widgets[name].set(*args)
+
+    def show(self):
+        """Clears the LCD and draws every widget, e.g. to switch to this
+        screen from another one.
+        """
+        self.lcd.clear()
+        for name, widget in self._order:
+            widget.invalidate()
+        self.update()
+
+    def update(self):
+        """Draws the widgets that changed. Returns how many there were."""
+        tracer = self.lcd.tracer
+        if tracer is None:
+            return self._update(None)
+        with tracer.section(self.name):
+            return self._update(tracer)
+
+    def _update(self, tracer):
+        lcd = self.lcd
+        count = 0
+        lcd.hal_begin_batch()
+        try:
+            for name, widget in self._order:
+                if not widget.dirty:
+                    continue
+                if tracer is None:
+                    widget.render(lcd)
+                else:
+                    with tracer.section(self.name + '/' + name):
+                        widget.render(lcd)
+                count += 1
+            lcd.flush()
+        finally:
+            lcd.hal_end_batch()
+        return count
@@ -0,0 +1,214 @@
+"""Drives an LCD from a background thread, so drawing never waits for the bus.
+
+    worker = FlushWorker(lcd)
+    worker.start()
+    while True:
+        worker.write_line(0, 'Temp %5.1f C' % read_temp())
+        worker.commit()
+"""
+import _thread
+from lcd_time import sleep_ms, ticks_ms, ticks_diff
+
+# What commit does when the queue is full.
+DROP_OLDEST = 'drop_oldest'     # drop the oldest queued frame
+COALESCE = 'coalesce'           # merge into the newest queued frame
+
+
+class FlushWorker:
+    """Owns an LCD and sends frames to it from a thread of its own.
+
+    The application draws with write_at, write_line and clear, which only
+    change a frame buffer protected by a lock, and calls commit() to hand
+    the frame to the worker. Frames wait in a queue of queue_size
+    preallocated buffers; the worker thread takes them in order, copies
+    each into the LCD's framebuffer and flushes it, which sends only the
+    cells that differ from what the LCD shows. All bus traffic happens on
+    the worker thread.
+
+    Errors from flushing are kept in error. After an OSError (e.g. a NACK
+    from the bus) the worker carries on and the cells that were not sent
+    go out with the next frame; any other exception stops the worker, and
+    sync() then returns False.
+
+    When the bus falls behind and the queue is full, policy decides what
+    commit does: DROP_OLDEST drops the oldest queued frame, so the LCD
+    still shows the most recent frames in order; COALESCE replaces the
+    newest queued frame, so the frames already queued are shown and the
+    latest state follows them. Either way the last frame committed always
+    reaches the LCD. dropped and coalesced count how often that happened.
+
+    Once the worker is started the LCD must only be used through it. It
+    uses _thread, which MicroPython on the ESP32 and CPython both have.
+    """
+    def __init__(self, lcd, queue_size=4, policy=COALESCE):
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError('unknown policy %r' % (policy,))
+        self.lcd = lcd
+        self.policy = policy
+        if lcd.framebuffer is None:
+            lcd.framebuffer_on()
+        size = lcd.num_lines * lcd.num_columns
+        self._frame = bytearray(lcd.framebuffer)
+        self._queue = [bytearray(size) for _ in range(max(queue_size, 1))]
+        self._first = 0         # index in _queue of the oldest frame
+        self._count = 0         # frames queued
+        self._busy = False      # the worker is sending a frame
+        self._lock = _thread.allocate_lock()
+        # Released to wake the worker up; acquired while there is nothing
+        # to do.
+        self._wake = _thread.allocate_lock()
+        self._wake.acquire()
+        self._done = _thread.allocate_lock()
+        self._running = False
+        self.error = None
+        self.committed = 0
+        self.frames = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def start(self):
+        """Starts the worker thread."""
+        if self._running:
+            return
+        self._running = True
+        self._done.acquire()
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self):
+        """Sends the frames still queued, then stops the worker thread and
+        waits for it to finish.
+        """
+        if not self._running:
+            return
+        with self._lock:
+            self._running = False
+            self._signal()
+        self._done.acquire()
+        self._done.release()
+
+    def write_at(self, cursor_x, cursor_y, text):
+        """Writes text at a position of the frame; see LcdApi.write_at."""
+        cols = self.lcd.num_columns
+        if not (0 <= cursor_x < cols and 0 <= cursor_y < self.lcd.num_lines):
+            return
+        room = cols - cursor_x
+        if isinstance(text, str):
+            text = self.lcd.encode(text[:room])
+        else:
+            text = text[:room]
+        start = cursor_y * cols + cursor_x
+        with self._lock:
+            self._frame[start:start + len(text)] = text
+
+    def write_line(self, cursor_y, text):
+        """Replaces a whole line of the frame; see LcdApi.write_line."""
+        if not 0 <= cursor_y < self.lcd.num_lines:
+            return
+        cols = self.lcd.num_columns
+        if isinstance(text, str):
+            text = self.lcd.encode(text[:cols])
+        else:
+            text = text[:cols]
+        start = cursor_y * cols
+        with self._lock:
+            frame = self._frame
+            frame[start:start + len(text)] = text
+            for i in range(start + len(text), start + cols):
+                frame[i] = 0x20
+
+    def clear(self):
+        """Blanks the frame. Unlike LcdApi.clear no clear command is sent:
+        the blank cells go out with the next flush.
+        """
+        with self._lock:
+            frame = self._frame
+            for i in range(len(frame)):
+                frame[i] = 0x20
+
+    def commit(self):
+        """Queues the frame as it is now for the worker to send. Never
+        waits for the bus; see the class documentation for what happens
+        when the queue is full.
+        """
+        with self._lock:
+            queue = self._queue
+            size = len(queue)
+            self.committed += 1
+            if self._count == size:
+                if self.policy == COALESCE:
+                    last = (self._first + self._count - 1) % size
+                    queue[last][:] = self._frame
+                    self.coalesced += 1
+                    return
+                self._first = (self._first + 1) % size
+                self._count -= 1
+                self.dropped += 1
+            queue[(self._first + self._count) % size][:] = self._frame
+            self._count += 1
+            self._signal()
+
+    def pending(self):
+        """Returns the number of frames queued or being sent."""
+        with self._lock:
+            return self._count + (1 if self._busy else 0)
+
+    def sync(self, timeout_ms=None):
+        """Waits until every committed frame has been sent, or timeout_ms
+        has passed. Returns True if they all were, and False as well if the
+        worker is not running (e.g. it stopped on an error) with frames
+        still to send.
+        """
+        start = ticks_ms()
+        while self.pending():
+            if not self._running:
+                return False
+            if (timeout_ms is not None and
+                    ticks_diff(ticks_ms(), start) >= timeout_ms):
+                return False
+            sleep_ms(1)
+        return True
+
+    def _signal(self):
+        # Called with _lock held, so only one thread can release _wake.
+        if self._wake.locked():
+            self._wake.release()
+
+    def _run(self):
+        lcd = self.lcd
+        try:
+            while True:
+                self._wake.acquire()
+                while self._next_frame(lcd):
+                    try:
+                        lcd.flush()
+                    except OSError as e:
+                        # The cells that were not sent go out with the
+                        # next frame.
+                        self.error = e
+                    with self._lock:
+                        self._busy = False
+                if not self._running:
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            # However the thread ends, pending() and sync() must not wait
+            # for it any more.
+            with self._lock:
+                self._busy = False
+                self._running = False
+            self._done.release()
+
+    def _next_frame(self, lcd):
+        """Moves the oldest queued frame into the LCD's framebuffer.
+        Returns False if there is none.
+        """
+        with self._lock:
+            if not self._count:
+                return False
+            lcd.framebuffer[:] = self._queue[self._first]
+            self._first = (self._first + 1) % len(self._queue)
+            self._count -= 1
+            self._busy = True
+            self.frames += 1
+            return True
@@ -0,0 +1,116 @@
+"""Implements a HD44780 character LCD connected via a 74HC595 shift register
+on SPI.
+"""
+from lcd_api import LcdApi
+from lcd_time import sleep_ms, ticks_us, ticks_diff
+
+# 74HC595 outputs, wired like the pins of the PCF8574 backpack in i2c_lcd:
+# Q0 RS, Q1 RW, Q2 E, Q3 backlight, Q4 - Q7 D4 - D7.
+MASK_RS = 0x01
+MASK_RW = 0x02
+MASK_E = 0x04
+SHIFT_BACKLIGHT = 3
+SHIFT_DATA = 4
+
+# How long the LCD takes to carry out an instruction, in usec: clear and
+# home, and everything else (see gpio_lcd).
+SLOW_EXEC_US = 5000
+EXEC_US = 50
+
+
+class SpiLcd(LcdApi):
+    """Drives a HD44780 LCD in 4 bit mode through a 74HC595 shift register.
+
+    spi is a machine.SPI (or SoftSPI) bus connected to SER and SRCLK of the
+    74HC595, and cs_pin an output machine.Pin connected to its RCLK: each
+    pin state is shifted in, then the outputs take it on the rising edge
+    of cs_pin. The outputs are wired like a PCF8574 backpack (see the MASK
+    constants); RW may be left unconnected and tied to ground.
+
+    As in gpio_lcd, the driver waits for the LCD only before the next
+    transfer, not after each one.
+    """
+    def __init__(self, spi, cs_pin, num_lines, num_columns):
+        self.spi = spi
+        self.cs_pin = cs_pin
+        self._frame = bytearray(1)
+        self._ready_at = ticks_us()
+        self.cs_pin.value(1)
+        self._write_frame(0)
+
+        sleep_ms(20)   # Allow LCD time to powerup
+        # Send reset 3 times, then put the LCD into 4 bit mode. The first
+        # reset needs a delay of at least 4.1 msec.
+        for nibble, delay in ((self.LCD_FUNCTION_RESET, 5),
+                              (self.LCD_FUNCTION_RESET, 1),
+                              (self.LCD_FUNCTION_RESET, 1),
+                              (self.LCD_FUNCTION, 1)):
+            self.hal_write_init_nibble(nibble)
+            sleep_ms(delay)
+        # The function set has to come before any other instruction. The
+        # backlight stays off until LcdApi.__init__ turns it on.
+        self.backlight = False
+        cmd = self.LCD_FUNCTION
+        if num_lines > 1:
+            cmd |= self.LCD_FUNCTION_2LINES
+        self.hal_write_command(cmd)
+        LcdApi.__init__(self, num_lines, num_columns)
+
+    def hal_write_init_nibble(self, nibble):
+        byte = ((nibble >> 4) & 0x0f) << SHIFT_DATA
+        self._write_frame(byte | MASK_E)
+        self._write_frame(byte)
+        self._ready_at = ticks_us()
+
+    def hal_backlight_on(self):
+        self._write_frame(1 << SHIFT_BACKLIGHT)
+
+    def hal_backlight_off(self):
+        self._write_frame(0)
+
+    def hal_write_command(self, cmd):
+        self._write_byte(0, cmd)
+        if cmd <= 3:
+            # Clear and home take much longer than other commands.
+            self._ready_at = ticks_us() + SLOW_EXEC_US
+
+    def hal_write_data(self, data):
+        self._write_byte(MASK_RS, data)
+
+    def hal_write_data_bulk(self, data, start=0, end=None):
+        if end is None:
+            end = len(data)
+        flags = MASK_RS | (self.backlight << SHIFT_BACKLIGHT)
+        write_nibble = self._write_nibble
+        for i in range(start, end):
+            byte = data[i]
+            while ticks_diff(self._ready_at, ticks_us()) > 0:
+                pass
+            write_nibble(flags | ((byte >> 4) << SHIFT_DATA))
+            write_nibble(flags | ((byte & 0x0f) << SHIFT_DATA))
+            self._ready_at = ticks_us() + EXEC_US
+
+    def hal_sleep_us(self, usecs):
+        # Every transfer already waits until the LCD is ready for it.
+        pass
+
+    def _write_byte(self, rs, value):
+        """Sends value as two nibbles, once the LCD is ready."""
+        while ticks_diff(self._ready_at, ticks_us()) > 0:
+            pass
+        flags = rs | (self.backlight << SHIFT_BACKLIGHT)
+        self._write_nibble(flags | (((value >> 4) & 0x0f) << SHIFT_DATA))
+        self._write_nibble(flags | ((value & 0x0f) << SHIFT_DATA))
+        self._ready_at = ticks_us() + EXEC_US
+
+    def _write_nibble(self, byte):
+        """Latches the nibble in byte with a pulse on E."""
+        self._write_frame(byte | MASK_E)
+        self._write_frame(byte)
+
+    def _write_frame(self, byte):
+        """Sets the outputs of the 74HC595 to byte."""
+        self._frame[0] = byte
+        self.cs_pin.value(0)
+        self.spi.write(self._frame)
+        self.cs_pin.value(1)
@@ -0,0 +1,56 @@
+import os
+import sys
+
+# The modules live at the top of the repository, as they do on the board.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lcd_api import LcdApi  # noqa: E402
+from lcd_bench import CountingI2C  # noqa: E402
+
+
+class StubLcd(LcdApi):
+    """An LcdApi whose HAL only talks to the test.
+
+    With record set it keeps the commands it is given in commands and the
+    data bytes in data; without, it drops them and allocates nothing.
+    fail, if given, is raised by every data write. hal_write_data_bulk is
+    left to LcdApi, which passes each byte to hal_write_data.
+    """
+
+    def __init__(self, num_lines=4, num_columns=20, record=True, fail=None):
+        self.record = record
+        self.fail = fail
+        self.commands = []
+        self.data = bytearray()
+        LcdApi.__init__(self, num_lines, num_columns)
+
+    def hal_backlight_on(self):
+        pass
+
+    def hal_backlight_off(self):
+        pass
+
+    def hal_write_command(self, cmd):
+        if self.record:
+            self.commands.append(cmd)
+
+    def hal_write_data(self, data):
+        if self.fail is not None:
+            raise self.fail
+        if self.record:
+            self.data.append(data)
+
+    def hal_sleep_us(self, usecs):
+        pass
+
+
+class RecordingI2C(CountingI2C):
+    """Also keeps every byte written, in order."""
+
+    def reset(self):
+        CountingI2C.reset(self)
+        self.sent = bytearray()
+
+    def writeto(self, addr, buf, stop=True):
+        self.sent.extend(buf)
+        return CountingI2C.writeto(self, addr, buf, stop)
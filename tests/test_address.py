@@ -0,0 +1,29 @@
+from conftest import StubLcd
+from lcd_api import LcdApi
+
+
+def test_putstr_sets_the_address_only_to_wrap():
+    lcd = StubLcd(4, 20)
+    lcd.commands = []
+    lcd.putstr('x' * 20)
+    ddram = [cmd for cmd in lcd.commands if cmd & LcdApi.LCD_DDRAM]
+    # The LCD advances its address counter itself; only the wrap onto
+    # line 1 (DDRAM 0x40) needs a command.
+    assert ddram == [LcdApi.LCD_DDRAM | 0x40]
+    assert lcd.data == b'x' * 20
+
+
+def test_writes_off_the_screen_are_dropped():
+    lcd = StubLcd(4, 20)
+    lcd.framebuffer_on()
+    for x, y in ((0, 4), (0, -1), (20, 0), (-3, 1)):
+        lcd.write_at(x, y, 'oops')
+    lcd.write_line(4, 'oops')
+    lcd.write_line(-1, 'oops')
+    assert len(lcd.framebuffer) == 80
+    assert lcd.framebuffer == b' ' * 80
+    lcd.framebuffer_off()
+    lcd.data = bytearray()
+    lcd.write_at(0, 4, 'oops')
+    lcd.write_line(7, 'oops')
+    assert lcd.data == b''
@@ -0,0 +1,101 @@
+import tracemalloc
+
+import pytest
+
+from conftest import StubLcd
+from i2c_lcd import I2cLcd
+from lcd_bench import CountingI2C, OPERATIONS, measure_heap
+
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def peak(func, *args):
+    """Returns the most memory func(*args) had allocated at any time,
+    including objects it freed again before returning.
+    """
+    func(*args)
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    func(*args)
+    return tracemalloc.get_traced_memory()[1] - before
+
+
+def growth(func, *args):
+    """Returns how much more memory is allocated after func(*args) than
+    before it.
+    """
+    before = tracemalloc.get_traced_memory()[0]
+    func(*args)
+    return tracemalloc.get_traced_memory()[0] - before
+
+
+def nothing():
+    pass
+
+
+def test_drawing_a_frame_does_not_allocate(traced):
+    lcd = StubLcd(4, 20, record=False)
+    lcd.framebuffer_on()
+    lines = (bytearray(b'A' * 20), bytearray(b'B' * 20))
+    for y in range(4):
+        assert peak(lcd.write_line, y, lines[y & 1]) == peak(nothing)
+
+
+def test_flushing_changes_costs_no_more_than_a_full_redraw(traced):
+    # The same cells go out either way; CPython's own loop objects are
+    # the only allocations, and they are in both.
+    lcd = StubLcd(4, 20, record=False)
+    lcd.framebuffer_on()
+    lcd.flush()
+    frames = (bytearray(b'AB' * 40), bytearray(b'BA' * 40))
+    count = [0]
+
+    def refresh(stale):
+        # Every call changes every cell.
+        count[0] += 1
+        lcd.framebuffer[:] = frames[count[0] & 1]
+        lcd._stale_lines = stale
+        lcd.flush()
+
+    assert peak(refresh, 0) <= peak(refresh, 0x0f)
+
+
+def test_str_text_allocates(traced):
+    # Encoding makes a new bytes object each time: the peak must show it.
+    lcd = StubLcd(4, 20, record=False)
+    lcd.framebuffer_on()
+    assert peak(lcd.write_line, 0, 'A' * 20) > peak(nothing)
+
+
+def test_bench_counts_freed_objects():
+    lcd = I2cLcd(CountingI2C(), 0x27, 4, 20)
+    lcd.framebuffer_on()
+    full_redraw = dict(OPERATIONS)['full_redraw']
+    assert measure_heap(lcd, full_redraw, 5) > 0
+
+
+def test_i2c_frame_refresh_keeps_no_memory(traced):
+    # A steady-state refresh of all 80 cells through the I2C driver.
+    lcd = I2cLcd(CountingI2C(), 0x27, 4, 20)
+    lcd.framebuffer_on()
+    lines = (bytearray(b'A' * 20), bytearray(b'B' * 20))
+
+    def refresh(frame):
+        for y in range(4):
+            lcd.write_line(y, lines[(frame + y) & 1])
+        lcd.flush()
+
+    def run():
+        # No for loop: its iterator would still be allocated at the end.
+        frame = 0
+        while frame < 20:
+            refresh(frame)
+            frame += 1
+
+    run()
+    assert growth(run) == growth(nothing)
@@ -0,0 +1,51 @@
+import asyncio
+
+from async_i2c_lcd import AsyncI2cLcd
+from lcd_sim import SimulatedI2C
+
+HEART = (0b00000, 0b01010, 0b11111, 0b11111,
+         0b11111, 0b01110, 0b00100, 0b00000)
+
+
+def test_updates_from_several_tasks_go_out_in_one_flush():
+    bus = SimulatedI2C()
+    backpack = bus.attach(0x27)
+
+    async def main():
+        lcd = AsyncI2cLcd(bus, 0x27, 4, 20)
+        flushes = []
+        flush = lcd.flush
+
+        async def counted_flush():
+            flushes.append(1)
+            await flush()
+
+        lcd.flush = counted_flush
+        await lcd.custom_char(0, HEART)
+        lcd.start()
+
+        async def writer(y, text):
+            lcd.write_line(y, text)
+
+        async def heart():
+            lcd.move_to(19, 3)
+            await lcd.putstr(chr(0))
+
+        await asyncio.gather(writer(0, 'Temp 21.5 C'),
+                             writer(1, 'Humidity 40%'),
+                             writer(2, 'Fan on'),
+                             heart())
+        await asyncio.sleep(0.05)
+        lcd.stop()
+        return flushes
+
+    flushes = asyncio.run(main())
+    assert len(flushes) == 1
+    assert backpack.lcd.screen(4, 20) == [
+        'Temp 21.5 C' + ' ' * 9,
+        'Humidity 40%' + ' ' * 8,
+        'Fan on' + ' ' * 14,
+        ' ' * 19 + '\x00',
+    ]
+    assert backpack.lcd.cgram[0:8] == bytes(HEART)
+    assert bus.violations == []
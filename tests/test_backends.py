@@ -0,0 +1,56 @@
+import pytest
+
+from gpio_lcd import GpioLcd
+from lcd_sim import Simulated74HC595, SimulatedParallelLcd
+from spi_lcd import SpiLcd
+
+ARROW = (0b00100, 0b01110, 0b11111, 0b00100,
+         0b00100, 0b00100, 0b00100, 0b00000)
+
+
+def gpio_4bit():
+    sim = SimulatedParallelLcd()
+    lcd = GpioLcd(sim.rs, sim.enable, d4_pin=sim.d4, d5_pin=sim.d5,
+                  d6_pin=sim.d6, d7_pin=sim.d7, rw_pin=sim.rw,
+                  backlight_pin=sim.backlight, num_lines=4, num_columns=20)
+    return sim, lcd
+
+
+def gpio_8bit():
+    sim = SimulatedParallelLcd()
+    lcd = GpioLcd(sim.rs, sim.enable, *sim.d, rw_pin=sim.rw,
+                  num_lines=4, num_columns=20)
+    return sim, lcd
+
+
+def spi():
+    sim = Simulated74HC595()
+    lcd = SpiLcd(sim, sim.cs, 4, 20)
+    return sim, lcd
+
+
+@pytest.mark.parametrize('make', (gpio_4bit, gpio_8bit, spi))
+def test_backend(make):
+    sim, lcd = make()
+    assert sim.lcd.eight_bit == (make is gpio_8bit)
+    lcd.putstr('Hello\nWorld')
+    lcd.custom_char(1, ARROW)
+    lcd.move_to(19, 3)
+    lcd.putchar(chr(1))
+    screen = sim.lcd.screen(4, 20)
+    assert screen[0] == 'Hello' + ' ' * 15
+    assert screen[1] == 'World' + ' ' * 15
+    assert screen[3] == ' ' * 19 + '\x01'
+    assert sim.lcd.cgram[8:16] == bytes(ARROW)
+
+    lcd.framebuffer_on()
+    lcd.write_line(0, 'Buffered')
+    lcd.write_at(10, 2, 'here')
+    # Nothing is sent before the flush.
+    assert sim.lcd.screen(4, 20)[0] == 'Hello' + ' ' * 15
+    lcd.flush()
+    screen = sim.lcd.screen(4, 20)
+    assert screen[0] == 'Buffered' + ' ' * 12
+    assert screen[1] == ' ' * 20
+    assert screen[2] == ' ' * 10 + 'here' + ' ' * 6
+    assert sim.violations == []
@@ -0,0 +1,20 @@
+from conftest import RecordingI2C
+from i2c_lcd import I2cLcd
+
+
+def putstr_traffic(batch, text):
+    bus = RecordingI2C()
+    lcd = I2cLcd(bus, 0x27, 2, 16, batch=batch)
+    bus.reset()
+    lcd.putstr(text)
+    return bus
+
+
+def test_putstr_is_one_write_when_batched():
+    text = 'Hello, LCD'
+    unbatched = putstr_traffic(False, text)
+    batched = putstr_traffic(True, text)
+    assert unbatched.transactions == 4 * len(text)
+    assert batched.transactions == 1
+    assert batched.sent == unbatched.sent
+    assert len(batched.sent) == 4 * len(text)
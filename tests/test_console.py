@@ -0,0 +1,25 @@
+import io
+
+import pytest
+
+from i2c_lcd import I2cLcd
+from lcd_console import Console
+from lcd_sim import SimulatedI2C
+
+
+def test_console_is_a_stream_for_dupterm():
+    bus = SimulatedI2C()
+    backpack = bus.attach(0x27)
+    console = Console(I2cLcd(bus, 0x27, 2, 16))
+    assert isinstance(console, io.IOBase)
+    print('boot ok', file=console)
+    console.refresh()
+    assert backpack.lcd.screen(2, 16)[1] == 'boot ok' + ' ' * 9
+    assert console.readinto(bytearray(1)) is None
+
+
+def test_max_fps_must_be_positive():
+    bus = SimulatedI2C()
+    bus.attach(0x27)
+    with pytest.raises(ValueError):
+        Console(I2cLcd(bus, 0x27, 2, 16), max_fps=0)
@@ -0,0 +1,41 @@
+from conftest import StubLcd
+from lcd_glyphs import GlyphCache
+
+
+def fill(cache, lcd):
+    """Defines g0 - g7, puts each on screen and returns their characters."""
+    chars = []
+    for n in range(8):
+        cache.define('g%d' % n, [n] * 8)
+        chars.append(cache.char('g%d' % n))
+    for char in chars:
+        lcd.putstr(char)
+    return chars
+
+
+def test_visible_glyph_kept_without_framebuffer():
+    lcd = StubLcd(2, 16)
+    cache = GlyphCache(lcd)
+    fill(cache, lcd)
+    cache.define('g8', [0x1f] * 8, fallback='#')
+    cache.new_frame()
+    # The cache cannot see the screen, so nothing may be evicted.
+    assert cache.char('g8') == '#'
+    assert cache.uploads == 8
+    cache.release('g0')
+    assert cache.char('g8') == chr(0)
+    assert cache.uploads == 9
+
+
+def test_framebuffer_evicts_only_what_left_the_screen():
+    lcd = StubLcd(2, 16)
+    lcd.framebuffer_on()
+    cache = GlyphCache(lcd)
+    chars = fill(cache, lcd)
+    cache.define('g8', [0x1f] * 8, fallback='#')
+    cache.new_frame()
+    assert cache.char('g8') == '#'
+    lcd.move_to(3, 0)
+    lcd.putstr(' ')
+    # chr(3) is gone from the screen, and its slot is taken over.
+    assert cache.char('g8') == chars[3]
@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import StubLcd
+from lcd_scheduler import RefreshScheduler
+
+
+def test_max_fps_must_be_positive():
+    with pytest.raises(ValueError):
+        RefreshScheduler(StubLcd(2, 16), max_fps=0)
+
+
+def test_stats_count_dropped_and_coalesced_updates():
+    lcd = StubLcd(2, 16)
+    lcd.framebuffer_on()
+    scheduler = RefreshScheduler(lcd, max_fps=10)
+    scheduler.update_line(0, 'first')
+    scheduler.update_line(0, 'second')     # replaces 'first'
+    scheduler.update(10, 1, 'x')
+    scheduler.update(12, 1, 'y')
+    assert scheduler.stats() == {
+        'submitted': 4,
+        'dropped': 1,
+        'coalesced': 0,
+        'frames': 0,
+        'pending': 3,
+    }
+    assert scheduler.service()
+    stats = scheduler.stats()
+    assert stats['frames'] == 1
+    assert stats['coalesced'] == 2          # three regions in one frame
+    assert stats['pending'] == 0
+    assert bytes(lcd.framebuffer) == (b'second' + b' ' * 10 +
+                                      b' ' * 10 + b'x y' + b' ' * 3)
+    # The next frame has to wait for the frame interval.
+    scheduler.update_line(1, 'later')
+    assert not scheduler.service()
+    assert scheduler.stats()['pending'] == 1
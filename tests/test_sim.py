@@ -0,0 +1,74 @@
+import i2c_lcd
+import lcd_api
+from i2c_lcd import I2cLcd
+from lcd_sim import SimulatedI2C
+
+
+def test_clear_after_traffic_keeps_timing():
+    bus = SimulatedI2C()
+    backpack = bus.attach(0x27)
+    lcd = I2cLcd(bus, 0x27, 4, 20)
+    lcd.putstr('x' * 80)
+    lcd.clear()
+    lcd.putstr('Hello')
+    assert bus.violations == []
+    assert backpack.lcd.screen(4, 20)[0] == 'Hello' + ' ' * 15
+
+
+def test_function_set_follows_switch_to_4bit():
+    bus = SimulatedI2C()
+    backpack = bus.attach(0x27)
+    I2cLcd(bus, 0x27, 2, 16)
+    assert bus.violations == []
+    assert backpack.lcd.two_lines
+
+
+def test_busy_flag_falls_back_with_rw_grounded():
+    bus = SimulatedI2C()
+    backpack = bus.attach(0x27, rw_wired=False)
+    lcd = I2cLcd(bus, 0x27, 2, 16, busy_flag=True)
+    lcd.putstr('Hello')
+    assert not lcd.busy_flag
+    assert bus.violations == []
+    assert backpack.lcd.screen(2, 16)[0] == 'Hello' + ' ' * 11
+
+
+def virtual_clock(monkeypatch):
+    """Returns a SimulatedI2C on a virtual clock that only moves with the
+    bus traffic and the driver's sleeps, so timings do not depend on how
+    busy the machine running the tests is.
+    """
+    now = [0]
+
+    def ticks_us():
+        if bus._bus_free is not None and bus._bus_free > now[0]:
+            now[0] = bus._bus_free
+        return now[0]
+
+    def sleep_us(usecs):
+        now[0] = ticks_us() + usecs
+
+    bus = SimulatedI2C(clock=ticks_us)
+    monkeypatch.setattr(i2c_lcd, 'ticks_us', ticks_us)
+    monkeypatch.setattr(i2c_lcd, 'sleep_ms', lambda msecs: sleep_us(1000 * msecs))
+    monkeypatch.setattr(lcd_api, 'sleep_us', sleep_us)
+    return bus
+
+
+def test_busy_flag_ends_clear_early(monkeypatch):
+    timings = {}
+    for busy_flag in (False, True):
+        bus = virtual_clock(monkeypatch)
+        backpack = bus.attach(0x27)
+        lcd = I2cLcd(bus, 0x27, 2, 16, busy_flag=busy_flag)
+        assert lcd.busy_flag == busy_flag
+        start = bus.clock()
+        lcd.clear()
+        timings[busy_flag] = bus.clock() - start
+        lcd.putstr('Hello')
+        assert bus.violations == []
+        assert backpack.lcd.screen(2, 16)[0] == 'Hello' + ' ' * 11
+    # The clear takes 1.52 msec; polling notices soon after.
+    assert timings[False] >= 5000
+    assert timings[True] < 2500
+
@@ -0,0 +1,59 @@
+from conftest import RecordingI2C, StubLcd
+from i2c_lcd import I2cLcd
+from lcd_trace import BusTracer
+
+
+def test_data_bytes_counted_once_with_the_default_bulk_write():
+    lcd = StubLcd(2, 16)
+    tracer = BusTracer(lcd)
+    lcd.write_line(0, b'Hello')
+    assert tracer.summary()['data_bytes'] == 16
+    assert lcd.data[-16:] == b'Hello' + b' ' * 11
+
+
+def test_sections_add_up_to_the_totals():
+    bus = RecordingI2C()
+    lcd = I2cLcd(bus, 0x27, 2, 16)
+    tracer = BusTracer(lcd)
+    bus.reset()
+    with tracer.section('top'):
+        lcd.move_to(0, 0)
+        lcd.putstr('Hi')
+    with tracer.section('bottom'):
+        lcd.write_line(1, 'There')
+    summary = tracer.summary()
+    top = summary['sections']['top']
+    bottom = summary['sections']['bottom']
+    assert top['data_bytes'] == 2
+    assert bottom['data_bytes'] == 16
+    assert summary['data_bytes'] == 18
+    for name in ('commands', 'bus_writes', 'bus_bytes'):
+        assert summary[name] == top[name] + bottom[name]
+    assert summary['bus_writes'] == bus.transactions
+    assert summary['bus_bytes'] == bus.bytes
+
+
+def test_trace_keeps_the_last_bytes_written():
+    bus = RecordingI2C()
+    lcd = I2cLcd(bus, 0x27, 2, 16)
+    tracer = BusTracer(lcd, trace_bytes=32)
+    bus.reset()
+    lcd.putstr('Hi')
+    assert tracer.trace() == bytes(bus.sent)
+    lcd.putstr('there, more than 32 bytes')
+    assert tracer.trace() == bytes(bus.sent[-32:])
+    assert tracer.summary()['traced_bytes'] == 32
+    tracer.reset()
+    assert tracer.trace() == b''
+
+
+def test_remove_restores_the_driver():
+    bus = RecordingI2C()
+    lcd = I2cLcd(bus, 0x27, 2, 16)
+    tracer = BusTracer(lcd)
+    tracer.remove()
+    assert lcd.i2c is bus
+    assert lcd.tracer is None
+    assert 'hal_write_data' not in lcd.__dict__
+    lcd.putstr('Hi')
+    assert tracer.summary()['data_bytes'] == 0
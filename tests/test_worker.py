@@ -0,0 +1,63 @@
+from conftest import StubLcd
+from lcd_worker import COALESCE, DROP_OLDEST, FlushWorker
+
+
+def commit_lines(worker, *texts):
+    for text in texts:
+        worker.write_line(0, text)
+        worker.commit()
+
+
+def test_drop_oldest_keeps_the_newest_frames():
+    lcd = StubLcd(2, 16)
+    worker = FlushWorker(lcd, queue_size=2, policy=DROP_OLDEST)
+    # Not started yet, so the queue fills up.
+    commit_lines(worker, 'one', 'two', 'three', 'four')
+    assert worker.dropped == 2
+    assert worker.coalesced == 0
+    assert worker.pending() == 2
+    worker.start()
+    assert worker.sync(timeout_ms=5000)
+    worker.stop()
+    assert worker.frames == 2
+    assert bytes(lcd.framebuffer[:16]) == b'four' + b' ' * 12
+    assert lcd.dirty_lines() == 0
+
+
+def test_coalesce_merges_into_the_newest_frame():
+    lcd = StubLcd(2, 16)
+    worker = FlushWorker(lcd, queue_size=2, policy=COALESCE)
+    commit_lines(worker, 'one', 'two', 'three', 'four')
+    assert worker.coalesced == 2
+    assert worker.dropped == 0
+    assert worker.committed == 4
+    worker.start()
+    assert worker.sync(timeout_ms=5000)
+    worker.stop()
+    # 'one' went out, then 'four' in place of 'two' and 'three'.
+    assert worker.frames == 2
+    assert bytes(lcd.framebuffer[:16]) == b'four' + b' ' * 12
+    assert lcd.dirty_lines() == 0
+
+
+def test_sync_returns_when_the_worker_dies():
+    worker = FlushWorker(StubLcd(2, 16, fail=ValueError('broken')))
+    worker.start()
+    # The first frame stops the worker; the second is still queued.
+    commit_lines(worker, 'Hello', 'World')
+    assert worker.sync(timeout_ms=5000) is False
+    assert isinstance(worker.error, ValueError)
+    worker.stop()
+
+
+def test_writes_off_the_frame_are_dropped():
+    lcd = StubLcd(2, 16)
+    worker = FlushWorker(lcd)
+    worker.write_at(0, 2, 'oops')
+    worker.write_at(-2, 0, 'oops')
+    worker.write_line(5, 'oops')
+    worker.commit()
+    worker.start()
+    assert worker.sync(timeout_ms=5000)
+    worker.stop()
+    assert lcd.framebuffer == b' ' * 32